@@ -0,0 +1,436 @@
+import os
+import sys
+import json
+import time
+import zlib
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+import multiprocessing
+import concurrent.futures
+from bisect import bisect_left, bisect_right
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl, unquote
+from xml.sax.saxutils import escape
+
+import requests
+
+import KeyExtract
+import ExtractHost
+import HttpProbe
+import ReportWriter
+
+# psutil 为可选依赖，用于按阶段统计内存峰值
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# 模拟服务器的默认配置
+DEFAULT_CONFIG = {
+    "objects": 20000,  # 存储桶中的对象数
+    "dirs": 10,  # 一级目录数
+    "page_size": 1000,  # 单页最多返回的对象数（与OSS一致）
+    "latency_ms": 5.0,  # 每个请求的固定延迟
+    "jitter_ms": 5.0,  # 随机附加延迟上限
+    "nosuchkey_rate": 0.3,  # 返回NoSuchKey的对象比例
+    "denied_rate": 0.2,  # 返回AccessDenied的对象比例
+    "slowdown_rate": 0.0,  # 返回503 SlowDown的对象比例
+    "object_size": 1024,  # 可读对象的大小（字节）
+    "dead_bucket": False,  # 整个存储桶返回NoSuchBucket
+}
+
+
+def make_keys(config):
+    """生成有序的对象Key列表"""
+    dirs = max(1, config["dirs"])
+    return sorted(f"dir{i % dirs:02d}/{i:09d}.dat" for i in range(config["objects"]))
+
+
+def error_body(code, message, resource=""):
+    request_id = "%024X" % random.getrandbits(96)
+    return (f'<?xml version="1.0" encoding="UTF-8"?>\n<Error><Code>{code}</Code>'
+            f'<Message>{escape(message)}</Message><RequestId>{request_id}</RequestId>'
+            f'<HostId>fake-oss.local</HostId><Resource>{escape(resource)}</Resource></Error>').encode("utf-8")
+
+
+class FakeOSSHandler(BaseHTTPRequestHandler):
+    """模拟OSS的列举接口和对象错误响应"""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle(head=False)
+
+    def do_HEAD(self):
+        self._handle(head=True)
+
+    def _send(self, status, body, content_type="application/xml", headers=None, head=False):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("x-oss-request-id", "%024X" % random.getrandbits(96))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def _handle(self, head):
+        config = self.server.config
+        delay = config["latency_ms"] + random.uniform(0, config["jitter_ms"])
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        parts = urlsplit(self.path)
+        if config["dead_bucket"]:
+            self._send(404, error_body("NoSuchBucket", "The specified bucket does not exist."), head=head)
+        elif parts.path == "/":
+            self._listing(dict(parse_qsl(parts.query)), head)
+        else:
+            self._object(unquote(parts.path[1:]), head)
+
+    def _listing(self, query, head):
+        keys = self.server.keys
+        config = self.server.config
+        prefix = query.get("prefix", "")
+        delimiter = query.get("delimiter", "")
+        max_keys = min(int(query.get("max-keys", config["page_size"])), config["page_size"])
+        v2 = query.get("list-type") == "2"
+        marker = query.get("continuation-token" if v2 else "marker") or query.get("start-after", "")
+
+        index = bisect_left(keys, prefix)
+        if marker:
+            # marker为公共前缀时跳过该前缀下的所有对象
+            if delimiter and marker.endswith(delimiter):
+                index = max(index, bisect_left(keys, marker + "\U0010ffff"))
+            else:
+                index = max(index, bisect_right(keys, marker))
+
+        contents, prefixes, last = [], [], None
+        while index < len(keys) and keys[index].startswith(prefix) and len(contents) + len(prefixes) < max_keys:
+            key = keys[index]
+            if delimiter:
+                pos = key.find(delimiter, len(prefix))
+                if pos >= 0:
+                    common = key[:pos + len(delimiter)]
+                    prefixes.append(common)
+                    last = common
+                    index = bisect_left(keys, common + "\U0010ffff")
+                    continue
+            contents.append(key)
+            last = key
+            index += 1
+        truncated = index < len(keys) and keys[index].startswith(prefix)
+
+        xml = ['<?xml version="1.0" encoding="UTF-8"?>\n<ListBucketResult>',
+               f'<Name>fake-bucket</Name><Prefix>{escape(prefix)}</Prefix><MaxKeys>{max_keys}</MaxKeys>',
+               f'<Delimiter>{escape(delimiter)}</Delimiter><IsTruncated>{str(truncated).lower()}</IsTruncated>']
+        if truncated and v2:
+            xml.append(f'<NextContinuationToken>{escape(last)}</NextContinuationToken>')
+        elif truncated:
+            xml.append(f'<NextMarker>{escape(last)}</NextMarker>')
+        if v2:
+            xml.append(f'<KeyCount>{len(contents) + len(prefixes)}</KeyCount>')
+        for key in contents:
+            xml.append(f'<Contents><Key>{escape(key)}</Key><LastModified>2024-01-01T00:00:00.000Z</LastModified>'
+                       f'<ETag>"{zlib.crc32(key.encode()):08X}"</ETag><Type>Normal</Type>'
+                       f'<Size>{config["object_size"]}</Size><StorageClass>Standard</StorageClass>'
+                       f'<Owner><ID>1000000000000000</ID><DisplayName>1000000000000000</DisplayName></Owner>'
+                       f'</Contents>')
+        for common in prefixes:
+            xml.append(f'<CommonPrefixes><Prefix>{escape(common)}</Prefix></CommonPrefixes>')
+        xml.append('</ListBucketResult>')
+        self._send(200, "".join(xml).encode("utf-8"), head=head)
+
+    def _object(self, key, head):
+        config = self.server.config
+        # 按Key的哈希决定响应类型，同一Key每次结果一致
+        point = zlib.crc32(key.encode("utf-8")) / 2 ** 32
+        if point < config["nosuchkey_rate"]:
+            self._send(404, error_body("NoSuchKey", "The specified key does not exist.", key), head=head)
+            return
+        point -= config["nosuchkey_rate"]
+        if point < config["denied_rate"]:
+            self._send(403, error_body("AccessDenied", "You have no right to access this object.", key), head=head)
+            return
+        point -= config["denied_rate"]
+        if point < config["slowdown_rate"]:
+            self._send(503, error_body("SlowDown", "Please reduce your request rate.", key), head=head)
+            return
+
+        size = config["object_size"]
+        body = b"x" * size
+        headers = {"ETag": f'"{zlib.crc32(key.encode()):08X}"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT",
+                   "Accept-Ranges": "bytes"}
+        range_header = self.headers.get("Range", "")
+        if range_header.startswith("bytes=") and size:
+            start, _, end = range_header[6:].partition("-")
+            start = int(start or 0)
+            end = min(int(end) if end else size - 1, size - 1)
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            self._send(206, body[start:end + 1], "application/octet-stream", headers, head)
+            return
+        self._send(200, body, "application/octet-stream", headers, head)
+
+
+class FakeOSSServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 4096  # 默认的5会在高并发下丢弃连接
+
+    def __init__(self, address, config):
+        super().__init__(address, FakeOSSHandler)
+        self.config = dict(DEFAULT_CONFIG, **config)
+        self.keys = make_keys(self.config)
+
+
+def _serve(config, port, ready):
+    server = FakeOSSServer(("127.0.0.1", port), config)
+    ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_server(config, port=0):
+    """在子进程中启动模拟服务器（与被测代码隔离CPU和内存），返回 (进程, 根地址)"""
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(config, port, ready), daemon=True)
+    process.start()
+    return process, f"http://127.0.0.1:{ready.get(timeout=60)}/"
+
+
+class PeakRSS:
+    """统计一个阶段内本进程的内存峰值（MB），未安装psutil时使用进程生命周期峰值"""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        process = psutil.Process()
+        while True:
+            self.peak = max(self.peak, process.memory_info().rss / 1024 / 1024)
+            if self._stop.wait(self.interval):
+                break
+
+    def __enter__(self):
+        if psutil is not None:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+        else:
+            import resource
+            self.peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def summarize(name, items, seconds, latencies, rss):
+    return {
+        "name": name,
+        "items": items,
+        "seconds": round(seconds, 3),
+        "rate": round(items / seconds, 1) if seconds else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "peak_rss_mb": round(rss.peak, 1),
+    }
+
+
+def bench_listing(base_url):
+    """KeyExtract：分页列举整个存储桶（带预取），延迟按单页请求统计"""
+    session = requests.Session()
+    latencies = []
+    url = base_url
+    while url:
+        start = time.perf_counter()
+        page = KeyExtract.fetch_listing_page(session, url)
+        latencies.append(time.perf_counter() - start)
+        params = KeyExtract.next_page_params(base_url, page)
+        url = KeyExtract.build_page_url(base_url, params) if params else None
+
+    with PeakRSS() as rss:
+        start = time.perf_counter()
+        count = sum(1 for _ in KeyExtract.iter_bucket_listing(base_url, session))
+        seconds = time.perf_counter() - start
+    return summarize("KeyExtract 列举", count, seconds, latencies, rss)
+
+
+def bench_extract_host(base_url, workdir, files, workers):
+    """ExtractHost：把列举结果写成多个xlsx，再并行提取Host列"""
+    records = list(KeyExtract.iter_bucket_listing(base_url))
+    chunk = max(1, len(records) // files)
+    paths = []
+    for n in range(files):
+        path = os.path.join(workdir, f"bench_{n:03d}_result.xlsx")
+        writer = ReportWriter.open_report(path, KeyExtract.RESULT_COLUMNS)
+        for i, record in enumerate(records[n * chunk:(n + 1) * chunk], 1):
+            writer.write_row(dict(record, 序号=i, Host=base_url + record["Key"]))
+        writer.close()
+        paths.append(path)
+
+    latencies = []
+    for path in paths[:min(3, len(paths))]:
+        start = time.perf_counter()
+        ExtractHost.extract_host_from_xlsx(path)
+        latencies.append(time.perf_counter() - start)
+
+    with PeakRSS() as rss:
+        start = time.perf_counter()
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max(1, min(workers, len(paths)))) as executor:
+            count = sum(len(hosts) for hosts, _ in executor.map(ExtractHost.extract_host_from_xlsx, paths))
+        seconds = time.perf_counter() - start
+    return summarize("ExtractHost 提取", count, seconds, latencies, rss), \
+        [base_url + record["Key"] for record in records]
+
+
+def bench_http(urls, concurrency, timeout, limiter=None):
+    """OSSURLChecker http引擎：与probe_urls相同的协程池，逐个记录请求耗时"""
+    latencies = []
+    verdicts = {"valid": 0, "invalid": 0, "denied": 0, "error": 0}
+
+    async def run():
+        url_iter = iter(urls)
+        async with HttpProbe.new_session(concurrency, timeout) as session:
+            async def worker():
+                for url in url_iter:
+                    start = time.perf_counter()
+                    result = await HttpProbe.probe_url(session, url, limiter)
+                    latencies.append(time.perf_counter() - start)
+                    verdicts[HttpProbe.verdict_of(result)] += 1
+
+            await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(urls))))))
+
+    with PeakRSS() as rss:
+        start = time.perf_counter()
+        asyncio.run(run())
+        seconds = time.perf_counter() - start
+    summary = summarize("OSSURLChecker http引擎", len(urls), seconds, latencies, rss)
+    summary["verdicts"] = verdicts
+    return summary
+
+
+def bench_selenium(urls, workers):
+    """OSSURLChecker selenium引擎（需要Chrome和chromedriver）"""
+    import OSSURLChecker
+
+    latencies = []
+    verdicts = {"valid": 0, "invalid": 0, "denied": 0, "error": 0}
+    with PeakRSS() as rss:
+        start = time.perf_counter()
+        pool = OSSURLChecker.DriverPool(max_drivers=workers)
+        try:
+            def check(url):
+                begin = time.perf_counter()
+                result = OSSURLChecker.process_url(url, pool)
+                latencies.append(time.perf_counter() - begin)
+                return result
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                for result in executor.map(check, urls):
+                    verdicts[HttpProbe.verdict_of(result) if result else "error"] += 1
+        finally:
+            pool.close_all()
+        seconds = time.perf_counter() - start
+    summary = summarize("OSSURLChecker selenium引擎", len(urls), seconds, latencies, rss)
+    summary["verdicts"] = verdicts
+    return summary
+
+
+def print_table(results):
+    print(f"\n{'场景':<28}{'数量':>9}{'耗时(s)':>10}{'速率(/s)':>11}{'p50(ms)':>10}{'p99(ms)':>10}{'内存峰值(MB)':>14}")
+    print("-" * 92)
+    for r in results:
+        print(f"{r['name']:<28}{r['items']:>9}{r['seconds']:>10}{r['rate']:>11}"
+              f"{r['p50_ms']:>10}{r['p99_ms']:>10}{r['peak_rss_mb']:>14}")
+        if "verdicts" in r:
+            print(f"{'':<28}结果分布: {r['verdicts']}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="OSS工具集基准测试（本地模拟OSS服务器）")
+    parser.add_argument("--objects", type=int, default=DEFAULT_CONFIG["objects"], help="模拟存储桶的对象数")
+    parser.add_argument("--dirs", type=int, default=DEFAULT_CONFIG["dirs"], help="一级目录数")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_CONFIG["page_size"], help="单页最多返回的对象数")
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_CONFIG["latency_ms"], help="每个请求的固定延迟")
+    parser.add_argument("--jitter-ms", type=float, default=DEFAULT_CONFIG["jitter_ms"], help="随机附加延迟上限")
+    parser.add_argument("--nosuchkey-rate", type=float, default=DEFAULT_CONFIG["nosuchkey_rate"])
+    parser.add_argument("--denied-rate", type=float, default=DEFAULT_CONFIG["denied_rate"])
+    parser.add_argument("--slowdown-rate", type=float, default=DEFAULT_CONFIG["slowdown_rate"])
+    parser.add_argument("--object-size", type=int, default=DEFAULT_CONFIG["object_size"], help="可读对象大小（字节）")
+    parser.add_argument("--concurrency", type=int, default=200, help="http引擎并发数")
+    parser.add_argument("--timeout", type=float, default=HttpProbe.DEFAULT_TIMEOUT)
+    parser.add_argument("--files", type=int, default=4, help="ExtractHost场景生成的xlsx文件数")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="ExtractHost场景的进程数")
+    parser.add_argument("--selenium", type=int, default=0, metavar="N",
+                        help="额外用selenium引擎检测前N个URL（需要Chrome）")
+    parser.add_argument("--json", default=None, help="把结果以JSON写入文件，便于版本间对比")
+    parser.add_argument("--serve", action="store_true", help="只启动模拟服务器（前台运行）")
+    parser.add_argument("--port", type=int, default=0, help="模拟服务器端口（默认随机）")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = {
+        "objects": args.objects, "dirs": args.dirs, "page_size": args.page_size,
+        "latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms,
+        "nosuchkey_rate": args.nosuchkey_rate, "denied_rate": args.denied_rate,
+        "slowdown_rate": args.slowdown_rate, "object_size": args.object_size,
+    }
+
+    if args.serve:
+        server = FakeOSSServer(("127.0.0.1", args.port), config)
+        print(f"模拟OSS服务器已启动: http://127.0.0.1:{server.server_address[1]}/ （Ctrl-C 退出）")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    process, base_url = start_server(config, args.port)
+    dead_process, dead_url = start_server(dict(config, objects=0, dead_bucket=True))
+    print(f"模拟OSS服务器: {base_url}（NoSuchBucket: {dead_url}），对象数 {args.objects}")
+
+    results = []
+    try:
+        results.append(bench_listing(base_url))
+        with tempfile.TemporaryDirectory() as workdir:
+            summary, urls = bench_extract_host(base_url, workdir, args.files, args.workers)
+            results.append(summary)
+
+        # 检测URL中混入约5%不存在的存储桶
+        urls += [f"{dead_url}{i:09d}.dat" for i in range(len(urls) // 20)]
+        random.Random(0).shuffle(urls)
+        results.append(bench_http(urls, args.concurrency, args.timeout))
+        if args.selenium:
+            results.append(bench_selenium(urls[:args.selenium], min(10, args.selenium)))
+    finally:
+        process.terminate()
+        dead_process.terminate()
+
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": config, "python": sys.version.split()[0], "results": results},
+                      f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import json
+import queue
+import sys
+import threading
+import time
+from collections import deque
+
+# 输出模式：text 为带颜色的逐条输出（默认），jsonl 为每个结果一行JSON（状态信息和进度写到stderr），
+# quiet 不输出逐条结果，只显示进度和统计
+OUTPUT_MODES = ("text", "jsonl", "quiet")
+# 进度刷新间隔（秒）
+DEFAULT_REFRESH = 0.25
+# 吞吐量按最近几秒内完成的数量计算
+RATE_WINDOW = 5.0
+# 清除光标到行尾的内容（重绘进度行时使用）
+CLEAR_LINE = "\033[K"
+
+_STOP = object()
+
+
+class EventSink:
+    """单线程写入的控制台输出
+
+    各线程只把事件放入队列，由写入线程批量格式化并一次写出，输出不会交错；
+    进度只记录最新值，由写入线程按refresh间隔重绘（附带吞吐量和预计剩余时间），
+    写入结果行之前先清除进度行。start()之前和close()之后的状态信息直接同步输出。
+    """
+
+    def __init__(self, mode="text", formatter=None, progress_formatter=None, stream=None,
+                 refresh=DEFAULT_REFRESH):
+        self.mode = mode
+        self.formatter = formatter or str
+        self.progress_formatter = progress_formatter or format_progress
+        self.stream = stream or sys.stdout
+        # jsonl 模式下标准输出只有结果行，便于直接交给其他工具处理
+        self.status_stream = sys.stderr if mode == "jsonl" else self.stream
+        self.refresh = refresh
+        self.results = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._progress = None
+        self._drawn = False
+        self._last_draw = 0.0
+        self._samples = deque()
+        self._show_progress = _is_tty(self.status_stream)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="event-sink", daemon=True)
+            self._thread.start()
+        return self
+
+    def result(self, result):
+        """输出一个检测结果（没有结果时忽略）"""
+        if result is None:
+            return
+        self.results += 1
+        if self.mode != "quiet":
+            self._emit(("result", result))
+
+    def message(self, text, end="\n"):
+        """输出状态信息"""
+        self._emit(("message", text + end))
+
+    def progress(self, processed, total=None):
+        """更新进度（只记录最新值，不立即输出）"""
+        self._progress = (processed, total)
+
+    def end_progress(self):
+        """检测结束：输出最终进度并换行，之后的状态信息（如统计）不再重绘进度"""
+        self._emit(("end", None))
+
+    def close(self):
+        """写出队列中剩余的事件和最终进度，之后的输出恢复为同步写入"""
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+        with self._lock:
+            for stream in {self.stream, self.status_stream}:
+                stream.flush()
+
+    def _emit(self, event):
+        if self._thread is not None:
+            self._queue.put(event)
+        else:
+            with self._lock:
+                self._write([event], final=False)
+
+    def _run(self):
+        while True:
+            try:
+                events = [self._queue.get(timeout=self.refresh)]
+            except queue.Empty:
+                events = []
+            # 一次取出队列中已有的全部事件，合并写出
+            while True:
+                try:
+                    events.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = _STOP in events
+            with self._lock:
+                self._write([event for event in events if event is not _STOP], final=stop)
+            if stop:
+                return
+
+    def _write(self, events, final):
+        segment = []
+        for event in events:
+            if event[0] == "end":
+                self._flush(segment, final=True)
+                self._progress = None
+                segment = []
+            else:
+                segment.append(event)
+        self._flush(segment, final)
+
+    def _flush(self, events, final):
+        lines = {}
+        for kind, payload in events:
+            if kind == "result":
+                text = json.dumps(payload, ensure_ascii=False) if self.mode == "jsonl" else self.formatter(payload)
+                lines.setdefault(self.stream, []).append(text + "\n")
+            else:
+                lines.setdefault(self.status_stream, []).append(payload)
+
+        now = time.monotonic()
+        redraw = self._show_progress and self._progress is not None and (
+            final or lines or now - self._last_draw >= self.refresh)
+        for stream, chunks in lines.items():
+            if self._drawn and stream is self.status_stream:
+                # 先清除进度行
+                stream.write("\r" + CLEAR_LINE)
+                self._drawn = False
+            stream.write("".join(chunks))
+            # 需要重绘时进度行由_draw写出后再刷新状态流，避免先刷出一个空行造成闪烁
+            if not redraw or stream is not self.status_stream:
+                stream.flush()
+
+        if redraw:
+            self._draw(now, final)
+
+    def _draw(self, now, final):
+        processed, total = self._progress
+        self._samples.append((now, processed))
+        while len(self._samples) > 2 and now - self._samples[0][0] > RATE_WINDOW:
+            self._samples.popleft()
+        first_time, first_count = self._samples[0]
+        rate = (processed - first_count) / (now - first_time) if now > first_time else 0.0
+        eta = (total - processed) / rate if total and rate > 0 else None
+
+        text = self.progress_formatter(processed, total, rate, eta)
+        self.status_stream.write("\r" + text + CLEAR_LINE + ("\n" if final else ""))
+        self.status_stream.flush()
+        self._drawn = not final
+        self._last_draw = now
+
+
+def _is_tty(stream):
+    try:
+        return stream.isatty()
+    except (AttributeError, ValueError):
+        return False
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def format_progress(processed, total, rate, eta):
+    """默认的进度文本：已完成数量、速率和预计剩余时间"""
+    text = f"已完成 {processed}" + (f"/{total}" if total else "") + f"  {rate:.1f}/秒"
+    if eta is not None:
+        text += f"  剩余约 {format_duration(eta)}"
+    return text
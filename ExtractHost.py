@@ -1,69 +1,175 @@
 import os
-import pandas as pd
+import json
+import argparse
+import concurrent.futures
+from openpyxl import load_workbook
+
+# 记录已处理文件（修改时间+大小）的清单文件
+MANIFEST_FILE = ".extracthost_manifest.json"
+# KeyExtract差异模式结果中的变更列，以及表示对象已删除的取值
+CHANGE_COLUMN = "Change"
+REMOVED = "removed"
 
 
 def extract_host_from_xlsx(file_path):
-    """从单个xlsx文件中提取Host列的内容"""
+    """从单个xlsx文件中提取Host列的内容
+
+    以只读模式流式读取，只解析表头和Host这一列，不加载其他列和样式。
+    返回 (去重后的Host列表, 错误信息)。
+    """
     try:
-        # 读取Excel文件
-        df = pd.read_excel(file_path)
+        wb = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            ws = wb.active
+            header = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), None)
+
+            # 检查是否存在Host列
+            if not header or 'Host' not in header:
+                return [], f"文件 {file_path} 中未找到Host列"
+
+            # 只读取Host列并保序去重
+            col = header.index('Host') + 1
+            hosts = {}
+            if CHANGE_COLUMN in header:
+                # KeyExtract差异模式的结果：已删除的对象不需要再检测
+                change_col = header.index(CHANGE_COLUMN) + 1
+                first, last = min(col, change_col), max(col, change_col)
+                for row in ws.iter_rows(min_row=2, min_col=first, max_col=last, values_only=True):
+                    value, change = row[col - first], row[change_col - first]
+                    if value is not None and str(value).strip() and change != REMOVED:
+                        hosts[str(value).strip()] = None
+                return list(hosts), None
+
+            for (value,) in ws.iter_rows(min_row=2, min_col=col, max_col=col, values_only=True):
+                if value is not None and str(value).strip():
+                    hosts[str(value).strip()] = None
+            return list(hosts), None
+        finally:
+            wb.close()
 
-        # 检查是否存在Host列
-        if 'Host' not in df.columns:
-            print(f"文件 {file_path} 中未找到Host列")
-            return []
+    except Exception as e:
+        return [], f"处理文件 {file_path} 时出错: {str(e)}"
 
-        # 提取Host列内容并去重
-        host_list = df['Host'].dropna().unique().tolist()
-        return host_list
 
-    except Exception as e:
-        print(f"处理文件 {file_path} 时出错: {str(e)}")
-        return []
+def file_signature(file_path):
+    stat = os.stat(file_path)
+    return {"mtime": stat.st_mtime, "size": stat.st_size}
+
+
+def load_manifest(manifest_path, output_file):
+    """读取清单，输出文件不存在或不是同一个输出文件时视为没有清单"""
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if manifest.get("output") != output_file or not os.path.exists(output_file):
+        return {}
+    return manifest.get("files", {})
+
+
+def save_manifest(manifest_path, output_file, files):
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({"output": output_file, "files": files}, f, ensure_ascii=False, indent=2)
 
 
-def save_hosts_to_file(hosts, filename="url.txt"):
-    """将host列表保存到文件中"""
+def load_hosts_file(filename):
+    with open(filename, 'r', encoding='utf-8') as f:
+        return {line.strip(): None for line in f if line.strip()}
+
+
+def save_hosts_to_file(hosts, filename="url.txt", append=False):
+    """将host列表保存到文件中，返回是否保存成功"""
     try:
-        with open(filename, 'w', encoding='utf-8') as f:
+        with open(filename, 'a' if append else 'w', encoding='utf-8') as f:
             for host in hosts:
                 f.write(f"{host}\n")
-        print(f"已成功将 {len(hosts)} 个唯一Host保存到 {filename}")
+        print(f"已成功将 {len(hosts)} 个{'新增' if append else '唯一'}Host保存到 {filename}")
+        return True
     except Exception as e:
         print(f"保存文件时出错: {str(e)}")
+        return False
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="从xlsx文件中批量提取Host列")
+    parser.add_argument("-d", "--dir", default=os.getcwd(), help="xlsx文件所在目录（默认当前目录）")
+    parser.add_argument("-o", "--output", default="url.txt", help="输出文件（默认url.txt）")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="并行处理的进程数（默认CPU核数）")
+    parser.add_argument("--full", action="store_true", help="忽略清单，重新处理所有文件")
+    return parser.parse_args()
 
 
 def main():
-    # 获取当前目录下所有的xlsx文件
-    current_dir = os.getcwd()
-    xlsx_files = [f for f in os.listdir(current_dir)
-                  if f.endswith('.xlsx') and os.path.isfile(os.path.join(current_dir, f))]
+    args = parse_args()
+
+    # 获取目录下所有的xlsx文件
+    current_dir = args.dir
+    xlsx_files = sorted(f for f in os.listdir(current_dir)
+                        if f.endswith('.xlsx') and not f.startswith('~$')
+                        and os.path.isfile(os.path.join(current_dir, f)))
 
     if not xlsx_files:
         print("当前目录下没有找到xlsx文件")
         return
 
-    # 存储所有提取到的Host
-    all_hosts = []
+    signatures = {f: file_signature(os.path.join(current_dir, f)) for f in xlsx_files}
+    manifest_path = os.path.join(current_dir, MANIFEST_FILE)
+    processed = {} if args.full else load_manifest(manifest_path, args.output)
 
-    # 处理每个xlsx文件
-    for file in xlsx_files:
-        file_path = os.path.join(current_dir, file)
-        print(f"正在处理文件: {file}")
+    # 清单中的文件被修改或删除时，已有输出不再可信，全部重新处理
+    if any(signatures.get(f) != {"mtime": v.get("mtime"), "size": v.get("size")} for f, v in processed.items()):
+        processed = {}
 
-        hosts = extract_host_from_xlsx(file_path)
-        all_hosts.extend(hosts)
+    pending = [f for f in xlsx_files if f not in processed]
+    incremental = bool(processed)
+    if incremental:
+        print(f"跳过 {len(processed)} 个未变化的已处理文件")
 
-        if hosts:
-            print(f"从 {file} 中提取到 {len(hosts)} 个Host")
-        print("---")
+    if not pending:
+        print(f"没有需要处理的新文件，{args.output} 已是最新")
+        return
+
+    # 存储所有提取到的Host（保序去重）
+    existing_hosts = load_hosts_file(args.output) if incremental else {}
+    new_hosts = {}
 
-    # 去重并显示所有结果
-    unique_hosts = list(set(all_hosts))
-    print(f"所有文件中总共提取到 {len(unique_hosts)} 个唯一的Host")
+    # 多个文件时使用进程池并行解析
+    paths = [os.path.join(current_dir, f) for f in pending]
+    workers = max(1, min(args.workers, len(paths)))
+    if workers > 1:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        outputs = executor.map(extract_host_from_xlsx, paths)
+    else:
+        executor = None
+        outputs = map(extract_host_from_xlsx, paths)
 
-    # 保存到文件
-    save_hosts_to_file(unique_hosts)
+    try:
+        for file, (hosts, error) in zip(pending, outputs):
+            print(f"正在处理文件: {file}")
+            if error:
+                # 读取失败（文件损坏、被Excel占用等）或没有Host列的文件不写入清单，下次运行重新处理
+                print(error)
+            else:
+                processed[file] = dict(signatures[file], hosts=len(hosts))
+            for host in hosts:
+                if host not in existing_hosts:
+                    new_hosts[host] = None
+
+            if hosts:
+                print(f"从 {file} 中提取到 {len(hosts)} 个Host")
+            print("---")
+    finally:
+        if executor:
+            executor.shutdown()
+
+    # 显示所有结果并保存到文件（增量时只追加新Host）
+    print(f"所有文件中总共提取到 {len(existing_hosts) + len(new_hosts)} 个唯一的Host")
+    if save_hosts_to_file(list(new_hosts), args.output, append=incremental):
+        save_manifest(manifest_path, args.output, processed)
+    else:
+        print("清单未更新，下次运行会重新处理这些文件")
 
 
 if __name__ == "__main__":
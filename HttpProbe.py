@@ -0,0 +1,443 @@
+import asyncio
+import re
+import socket
+import time
+from urllib.parse import urlsplit
+from xml.sax.saxutils import unescape
+
+import aiohttp
+from aiohttp.abc import AbstractResolver
+
+import RateLimiter
+import Retry
+
+# 默认并发请求数（异步引擎可以同时保持上千个请求）
+DEFAULT_CONCURRENCY = 1000
+# 单个请求超时时间（秒），与Selenium的页面加载超时保持一致
+DEFAULT_TIMEOUT = 15
+
+# OSS错误XML中需要提取的字段
+ERROR_FIELDS = ("Code", "Message", "Resource", "RequestId")
+# 表示对象/存储桶不存在的错误码
+NOT_EXIST_CODES = {"NoSuchKey", "NoSuchBucket"}
+
+# 每个请求最多读取的字节数：错误XML只有几百字节，可读对象只需确认存在，不下载内容
+DEFAULT_PREFIX_BYTES = 4096
+# 请求方式：range 只取前几KB（默认），head 只取状态码和响应头，get 为完整GET（仍只读取前缀）
+PROBE_METHODS = ("range", "head", "get")
+
+# 错误XML字段，直接在原始字节上匹配（允许命名空间前缀，前缀被截断时也能取到已有字段）
+FIELD_PATTERN = re.compile(rb"<(?:[\w.-]+:)?(Code|Message|Resource|RequestId)>([^<]*)</")
+# 错误标记，一次扫描同时匹配：对象不存在 / 访问拒绝 / 限流
+MARKER_PATTERN = rb"(?P<missing>not exist)|(?P<denied>access ?denied)|(?P<throttled>slow ?down|too many requests)"
+MARKERS = re.compile(MARKER_PATTERN, re.IGNORECASE)
+# 同样的标记用于浏览器返回的页面文本（避免对整个页面再做一次lower()拷贝）
+TEXT_MARKERS = re.compile(MARKER_PATTERN.decode(), re.IGNORECASE)
+
+# 未单独归类的4xx（429限流除外）的Message，属于明确的无效结论而不是请求错误
+CLIENT_ERROR_PATTERN = re.compile(r"HTTP 4(?!29)\d\d\b")
+
+# 存储桶级结论：不存在 / 禁止列举（私有）
+BUCKET_DEAD = "dead"
+BUCKET_PRIVATE = "private"
+# 存储桶域名不存在（NXDOMAIN）时的结论信息，与OSS的NoSuchBucket一样按不存在处理
+NXDOMAIN_INFO = {"Code": "NoSuchBucket", "Message": "Bucket host does not resolve (NXDOMAIN)"}
+
+
+def new_result(url):
+    """创建与Selenium后端字段一致的结果字典"""
+    return {
+        "url": url,
+        "Code": "",
+        "Message": "",
+        "Resource": "",
+        "RequestId": "",
+        "valid": True,
+        "access_denied": False
+    }
+
+
+def is_error(result):
+    """请求失败（超时、连接错误、服务端错误）而非明确结论的结果"""
+    return (not result["valid"] and not result["access_denied"]
+            and bool(result["Message"]) and result["Code"] not in NOT_EXIST_CODES
+            and not CLIENT_ERROR_PATTERN.match(result["Message"]))
+
+
+def verdict_of(result):
+    """结果的简短分类标签：valid / denied / invalid / error"""
+    if result["access_denied"]:
+        return "denied"
+    if result["valid"]:
+        return "valid"
+    return "error" if is_error(result) else "invalid"
+
+
+def is_retryable(result):
+    """超时、连接错误、服务端错误和限流值得重试，明确结论和本地异常不重试"""
+    message = result["Message"]
+    return (is_error(result) and not message.startswith("Unexpected error")
+            and message != Retry.CIRCUIT_OPEN_MESSAGE)
+
+
+def is_host_failure(result):
+    """说明host本身不可用的失败（计入熔断），限流说明host正常，只重试不熔断"""
+    return (is_retryable(result) and result["Code"] not in RateLimiter.THROTTLE_CODES
+            and result["Message"] != "HTTP 429")
+
+
+def parse_error_xml(body):
+    """从OSS返回的错误XML（或其前缀）中提取Code/Message/Resource/RequestId"""
+    info = {}
+    if not body:
+        return info
+
+    for match in FIELD_PATTERN.finditer(body):
+        tag = match.group(1).decode("ascii")
+        if tag not in info:
+            info[tag] = unescape(match.group(2).decode("utf-8", "replace")).strip()
+    return info
+
+
+def find_markers(data):
+    """一次扫描找出出现的错误标记（missing / denied / throttled），data为bytes或str"""
+    pattern = MARKERS if isinstance(data, (bytes, bytearray)) else TEXT_MARKERS
+    return {match.lastgroup for match in pattern.finditer(data)}
+
+
+def classify_response(url, status, body):
+    """根据状态码和错误XML（可以只是响应体的前几KB）对URL进行分类
+
+    206表示范围请求成功，416表示对象存在但为空，两者都按可读取处理；
+    其他未归类的4xx（如400、401、405）都按无效处理，不沿用Selenium后端"没有标记即有效"的判断。
+    """
+    result = new_result(url)
+    if status < 300 or status == 416:
+        # 可以直接读取的对象，与Selenium后端一样补齐缺失字段
+        for key in ERROR_FIELDS:
+            result[key] = "N/A"
+        return result
+
+    info = parse_error_xml(body)
+    result.update(info)
+    code = info.get("Code", "")
+    markers = find_markers(body) if body else set()
+
+    if status == 404 or code in NOT_EXIST_CODES or "missing" in markers:
+        result["valid"] = False
+    elif status == 403 or code == "AccessDenied" or "denied" in markers:
+        result["valid"] = False
+        result["access_denied"] = True
+    elif status >= 500 or status == 429:
+        # 服务端错误或限流，结果不可信，按错误处理
+        result["valid"] = False
+        if not result["Message"]:
+            result["Message"] = f"HTTP {status}"
+    elif status >= 400:
+        # 其他客户端错误是明确结论，Message记为状态码和错误码（见CLIENT_ERROR_PATTERN）
+        result["valid"] = False
+        result["Message"] = f"HTTP {status} {code}" if code else f"HTTP {status}"
+    return result
+
+
+def error_result(url, message):
+    """请求失败（超时、连接错误等）时的结果"""
+    result = new_result(url)
+    result["Message"] = message
+    result["valid"] = False
+    return result
+
+
+async def read_prefix(response, limit=DEFAULT_PREFIX_BYTES):
+    """最多读取响应体的前limit字节，剩余部分不下载（连接随后关闭而不复用）"""
+    chunks = []
+    size = 0
+    while size < limit:
+        chunk = await response.content.read(limit - size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size += len(chunk)
+    return b"".join(chunks)
+
+
+async def probe_url(session, url, limiter=None, cache=None, metrics=None, method="range",
+                    prefix_bytes=DEFAULT_PREFIX_BYTES, retry=None, breaker=None, resolver=None):
+    """对单个URL发送请求并分类，缓存过期时带条件请求重新验证
+
+    method为range时请求前prefix_bytes字节，head时只看状态码；无论哪种方式
+    都最多读取prefix_bytes字节，不会下载完整对象。
+    retry为重试策略，超时、连接错误、5xx和限流按指数退避重试；breaker为按host的
+    熔断器，host熔断期间直接返回错误结果，不再占用并发。
+    resolver为共享的DNS缓存，域名已确认不存在时不发送请求，直接按存储桶不存在处理。
+    metrics不为None时记录各阶段耗时：限速等待、DNS、建连、首字节（由会话的
+    trace配置填入）、读取响应体和分类。
+    """
+    entry = cache.get(url) if cache else None
+    if entry and entry.fresh:
+        return entry.result
+
+    headers = {"Range": f"bytes=0-{prefix_bytes - 1}"} if method == "range" else {}
+    if entry:
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+    phases = {} if metrics else None
+    start = time.perf_counter()
+
+    def attempt():
+        return _probe_once(session, url, headers, entry, limiter, cache, phases, method, prefix_bytes, resolver)
+
+    try:
+        host = urlsplit(url).netloc
+        if resolver and is_unresolvable(url, resolver):
+            result = nxdomain_result(url)
+        else:
+            result = await Retry.call_async(attempt, retry, breaker, host.lower(),
+                                            should_retry=is_retryable, is_host_failure=is_host_failure)
+    except Retry.CircuitOpenError:
+        result = error_result(url, Retry.CIRCUIT_OPEN_MESSAGE)
+    except ValueError as e:
+        # 无法解析的URL（如 http://[bad）只影响这一条
+        return error_result(url, f"Invalid URL: {str(e)}")
+
+    if metrics:
+        phases["total"] = time.perf_counter() - start
+        metrics.observe(host, phases)
+        metrics.count(host, verdict_of(result))
+    return result
+
+
+async def _probe_once(session, url, headers, entry, limiter, cache, phases, method, prefix_bytes, resolver=None):
+    """发送一次请求并分类，请求失败时返回错误结果"""
+    start = time.perf_counter()
+    try:
+        if limiter:
+            await limiter.acquire_async(url)
+        if phases is not None:
+            phases["ratelimit_wait"] = time.perf_counter() - start
+        request = session.head if method == "head" else session.get
+        async with request(url, headers=headers, allow_redirects=True, trace_request_ctx=phases) as response:
+            if response.status == 304 and entry:
+                # 对象未变化，沿用缓存结果
+                cache.touch(url)
+                result = entry.result
+            else:
+                mark = time.perf_counter()
+                body = b"" if method == "head" else await read_prefix(response, prefix_bytes)
+                if phases is not None:
+                    phases["download"] = time.perf_counter() - mark
+                    mark = time.perf_counter()
+                result = classify_response(url, response.status, body)
+                if phases is not None:
+                    phases["classify"] = time.perf_counter() - mark
+                # 服务端错误和限流不缓存
+                if cache and response.status < 500 and response.status != 429:
+                    cache.put(result, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+            if limiter:
+                limiter.feedback(url, response.status, result["Code"])
+            return result
+    except asyncio.TimeoutError:
+        return error_result(url, "Timeout")
+    except aiohttp.ClientError as e:
+        if resolver and is_unresolvable(url, resolver):
+            # 解析时才发现域名不存在，不再重试
+            return nxdomain_result(url)
+        return error_result(url, f"Error: {str(e)}")
+    except Exception as e:
+        return error_result(url, f"Unexpected error: {str(e)}")
+
+
+def is_unresolvable(url, resolver):
+    """URL的主机名已确认不存在（只查共享DNS缓存，不发起查询）"""
+    host = urlsplit(url).hostname
+    return bool(host) and resolver.is_missing(host)
+
+
+class CachedResolver(AbstractResolver):
+    """使用共享DNS缓存（Resolver.HostResolver）的aiohttp解析器
+
+    缓存命中时直接返回，不再占用线程池；未命中时在线程池中解析并写入共享缓存。
+    """
+
+    def __init__(self, resolver):
+        self.resolver = resolver
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        addresses = self.resolver.cached(host)
+        if not addresses:
+            # 未缓存时解析；已确认不存在时resolve直接抛出socket.gaierror
+            addresses = await asyncio.get_running_loop().run_in_executor(None, self.resolver.resolve, host)
+        results = [{"hostname": host, "host": ip, "port": port, "family": address_family,
+                    "proto": socket.IPPROTO_TCP, "flags": socket.AI_NUMERICHOST | socket.AI_NUMERICSERV}
+                   for address_family, ip in addresses if not family or address_family == family]
+        if not results:
+            raise OSError(None, f"{host}: no address for the requested family")
+        return results
+
+    async def close(self):
+        pass
+
+
+def create_trace_config():
+    """记录DNS、建连和首字节耗时的aiohttp trace配置
+
+    耗时写入请求时通过trace_request_ctx传入的字典。aiohttp的建连回调包含TLS握手，
+    无法单独拆出，因此http引擎的connect阶段即TCP+TLS。
+    """
+    trace_config = aiohttp.TraceConfig()
+
+    def now():
+        return asyncio.get_running_loop().time()
+
+    async def on_request_start(session, ctx, params):
+        ctx.ready = now()
+        ctx.dns = 0.0
+
+    async def on_dns_start(session, ctx, params):
+        ctx.dns_start = now()
+
+    async def on_dns_end(session, ctx, params):
+        ctx.dns = now() - ctx.dns_start
+        if ctx.trace_request_ctx is not None:
+            ctx.trace_request_ctx["dns"] = ctx.dns
+
+    async def on_connection_create_start(session, ctx, params):
+        ctx.connect_start = now()
+
+    async def on_connection_create_end(session, ctx, params):
+        ctx.ready = now()
+        if ctx.trace_request_ctx is not None:
+            ctx.trace_request_ctx["connect"] = ctx.ready - ctx.connect_start - ctx.dns
+
+    async def on_connection_reuseconn(session, ctx, params):
+        ctx.ready = now()
+
+    async def on_request_end(session, ctx, params):
+        if ctx.trace_request_ctx is not None:
+            ctx.trace_request_ctx["ttfb"] = now() - ctx.ready
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_dns_resolvehost_start.append(on_dns_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_end)
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config
+
+
+def new_session(concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT, user_agent=None, verify_ssl=True,
+                metrics=None, resolver=None):
+    """创建共享连接池的aiohttp会话，需要记录阶段耗时时挂上trace配置，指定resolver时使用共享DNS缓存"""
+    connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300,
+                                     resolver=CachedResolver(resolver) if resolver else None,
+                                     ssl=None if verify_ssl else False)
+    headers = {"User-Agent": user_agent} if user_agent else None
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    trace_configs = [create_trace_config()] if metrics else None
+    return aiohttp.ClientSession(connector=connector, timeout=client_timeout, headers=headers,
+                                 trace_configs=trace_configs)
+
+
+async def probe_urls(urls, on_result, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT,
+                     user_agent=None, verify_ssl=True, limiter=None, cache=None, metrics=None,
+                     method="range", prefix_bytes=DEFAULT_PREFIX_BYTES, retry=None, breaker=None, resolver=None):
+    """使用固定数量的协程并发检测URL，每得到一个结果就调用on_result
+
+    urls可以是普通迭代器，也可以是异步迭代器（例如边列举边产出URL的队列）。
+    """
+    async with new_session(concurrency, timeout, user_agent, verify_ssl, metrics, resolver) as session:
+        async def check(url):
+            on_result(await probe_url(session, url, limiter, cache, metrics, method, prefix_bytes,
+                                      retry, breaker, resolver))
+
+        if hasattr(urls, "__anext__"):
+            async def worker():
+                async for url in urls:
+                    await check(url)
+        else:
+            # 所有协程共享同一个迭代器，URL按需取出，不会一次性创建全部任务
+            url_iter = iter(urls)
+
+            async def worker():
+                for url in url_iter:
+                    await check(url)
+
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+
+
+def run_probe(urls, on_result, **kwargs):
+    """同步入口：在新的事件循环中运行异步检测引擎"""
+    asyncio.run(probe_urls(urls, on_result, **kwargs))
+
+
+def bucket_root(url):
+    """URL所属存储桶的根地址（scheme://host/）"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}/"
+
+
+async def probe_bucket(session, root, limiter=None, resolver=None):
+    """列举存储桶（max-keys=1）一次，返回 (结论, 错误信息)，无法得出桶级结论时结论为None"""
+    if resolver and is_unresolvable(root, resolver):
+        return BUCKET_DEAD, NXDOMAIN_INFO
+    try:
+        if limiter:
+            await limiter.acquire_async(root)
+        async with session.get(root, params={"max-keys": "1"}) as response:
+            body = await read_prefix(response)
+            info = parse_error_xml(body) if response.status >= 300 else {}
+            if limiter:
+                limiter.feedback(root, response.status, info.get("Code"))
+    except Exception:
+        return None, {}
+
+    code = info.get("Code")
+    if code == "NoSuchBucket":
+        return BUCKET_DEAD, info
+    if code == "AccessDenied":
+        return BUCKET_PRIVATE, info
+    return None, info
+
+
+async def probe_buckets(roots, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT,
+                        user_agent=None, verify_ssl=True, limiter=None, resolver=None):
+    """并发探测多个存储桶，返回 根地址 -> (结论, 错误信息)，只包含得出结论的存储桶"""
+    verdicts = {}
+    root_iter = iter(roots)
+
+    async with new_session(concurrency, timeout, user_agent, verify_ssl, resolver=resolver) as session:
+        async def worker():
+            for root in root_iter:
+                verdict, info = await probe_bucket(session, root, limiter, resolver)
+                if verdict:
+                    verdicts[root] = (verdict, info)
+
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return verdicts
+
+
+def run_bucket_probe(roots, **kwargs):
+    """同步入口：探测存储桶并返回桶级结论"""
+    return asyncio.run(probe_buckets(roots, **kwargs))
+
+
+def inferred_result(url, verdict, info):
+    """根据存储桶级结论直接生成对象的结果（不单独请求）"""
+    result = new_result(url)
+    result["Code"] = info.get("Code", "")
+    result["Message"] = info.get("Message", "")
+    result["RequestId"] = info.get("RequestId", "")
+    result["Resource"] = bucket_root(url)
+    result["valid"] = False
+    result["access_denied"] = verdict == BUCKET_PRIVATE
+    result["inferred"] = True
+    return result
+
+
+def nxdomain_result(url):
+    """存储桶域名不存在时直接生成的结果（未发送HTTP请求）"""
+    return inferred_result(url, BUCKET_DEAD, NXDOMAIN_INFO)
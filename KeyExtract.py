@@ -1,10 +1,20 @@
 import requests
-from bs4 import BeautifulSoup
+import xml.etree.ElementTree as ET
 import re
-import time
 import os
-import pandas as pd
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
+import argparse
+import concurrent.futures
+import queue
+import threading
+from collections import namedtuple, defaultdict
+from itertools import zip_longest
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import ReportWriter
+import Resolver
+import Retry
+import Snapshot
+import UrlSource
 
 
 # 颜色代码定义
@@ -19,6 +29,34 @@ class Colors:
     UNDERLINE = '\033[4m'
 
 
+# 列举结果中每个对象要提取的标签
+LISTING_TAGS = ['Key', 'Size', 'Type', 'ID', 'LastModified', 'ETag']
+# 结果表格的列（序号在最前面，Host紧跟Key）
+RESULT_COLUMNS = ['序号', 'Key', 'Host'] + LISTING_TAGS[1:]
+# 差异模式：额外记录对象的变更类型（added / changed / removed）
+DIFF_COLUMN = 'Change'
+
+# 批量模式：合并输出时额外记录对象所属的存储桶
+BATCH_COLUMNS = RESULT_COLUMNS + ['Bucket']
+# 批量模式默认同时列举的存储桶数、同一host同时列举的存储桶数
+DEFAULT_BATCH_WORKERS = 16
+DEFAULT_PER_HOST = 4
+
+# 需要重试的列举响应状态码（服务端错误和限流）
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# 列举请求的重试策略和按host的熔断器（可通过命令行参数调整）
+LISTING_RETRY = Retry.RetryPolicy()
+LISTING_BREAKER = Retry.CircuitBreaker()
+# 列举请求共用的DNS缓存（main中安装到socket层，requests的解析也经过它）
+LISTING_RESOLVER = Resolver.HostResolver()
+
+# 前缀分发模式默认同时列举的前缀数
+DEFAULT_FANOUT_WORKERS = 16
+
+# 单页列举结果：对象记录、是否被截断、下一页的marker/continuation-token、公共前缀（指定delimiter时）
+ListingPage = namedtuple('ListingPage', ['records', 'truncated', 'next_marker', 'next_token', 'prefixes'])
+
+
 def print_separator():
     """打印分隔线美化输出"""
     print(f"\n{Colors.OKBLUE}" + "=" * 60 + f"{Colors.ENDC}\n")
@@ -48,77 +86,306 @@ def create_filename_from_url(url):
     return f"{safe_domain}_{safe_path}"
 
 
-def get_unique_filename(base_name):
-    """生成唯一Excel文件名，若存在则添加递增序号"""
+def get_unique_filename(base_name, extension="xlsx"):
+    """生成唯一结果文件名，若存在则添加递增序号"""
     full_base = f"{base_name}_result"
 
     # 检查文件是否存在
-    if not os.path.exists(f"{full_base}.xlsx"):
-        return f"{full_base}.xlsx"
+    if not os.path.exists(f"{full_base}.{extension}"):
+        return f"{full_base}.{extension}"
 
     # 若存在则添加序号
     counter = 1
     while True:
         # 格式化序号为两位数字（01, 02, ..., 99）
-        numbered_name = f"{full_base}_{counter:02d}.xlsx"
+        numbered_name = f"{full_base}_{counter:02d}.{extension}"
         if not os.path.exists(numbered_name):
             return numbered_name
         counter += 1
         # 限制最大序号，避免无限循环
         if counter > 99:
-            return f"{full_base}_{counter}.xlsx"
-
-
-def format_excel(file_path):
-    """美化Excel表格"""
-    # 打开Excel文件
-    df = pd.read_excel(file_path)
-    writer = pd.ExcelWriter(file_path, engine='openpyxl', mode='a', if_sheet_exists='replace')
-    df.to_excel(writer, index=False, sheet_name='Results')
-
-    # 获取工作表
-    worksheet = writer.sheets['Results']
-
-    # 定义样式
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    alignment = Alignment(vertical='center', wrap_text=False)
-
-    # 设置表头样式
-    for cell in worksheet[1]:  # 表头在第二行（索引1）
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.border = border
-        cell.alignment = alignment
-
-    # 设置数据单元格样式和列宽
-    for row in worksheet.iter_rows(min_row=2):
-        for cell in row:
-            cell.border = border
-            cell.alignment = alignment
-
-    # 特殊设置序号列居中显示
-    if '序号' in [cell.value for cell in worksheet[1]]:
-        index_col = [cell.value for cell in worksheet[1]].index('序号')
-        index_letter = worksheet.cell(row=1, column=index_col + 1).column_letter
-        for cell in worksheet[index_letter]:
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-
-    # 自动调整列宽
-    for column_cells in worksheet.columns:
-        length = max(len(str(cell.value)) for cell in column_cells) + 2
-        worksheet.column_dimensions[column_cells[0].column_letter].width = min(length, 50)  # 最大宽度限制
-
-    writer.close()
-
-
-def extract_and_process():
+            return f"{full_base}_{counter}.{extension}"
+
+
+def bucket_base_url(url):
+    """列举地址对应的存储桶根地址（scheme://host/），用于拼接对象的完整链接"""
+    base_url_match = re.search(r'(https?://[^/]+/)', url)
+    return base_url_match.group(1) if base_url_match else ""
+
+
+def object_url(base_url, key):
+    """对象的完整链接（即结果表格中的Host列）"""
+    return f"{base_url}{key}" if base_url else key
+
+
+def build_page_url(url, params, drop=()):
+    """在原始URL的查询参数基础上覆盖分页参数，drop中的参数会被去掉"""
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+    query.update(params)
+    for name in drop:
+        query.pop(name, None)
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def local_name(tag):
+    """去掉XML标签的命名空间前缀（S3兼容接口会带xmlns）"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def parse_listing_stream(chunks):
+    """增量解析ListBucketResult字节流
+
+    边接收边解析，每个<Contents>解析完立即提取字段并清除，
+    解析耗时与对象数量线性相关，内存中不保留整棵XML树。
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    records = []
+    prefixes = []
+    meta = {}
+    root = None
+    depth = 0
+
+    def handle_events():
+        nonlocal root, depth
+        for event, elem in parser.read_events():
+            if event == 'start':
+                if root is None:
+                    root = elem
+                depth += 1
+                continue
+
+            depth -= 1
+            if depth != 1:
+                continue
+
+            # 根节点的直接子元素：对象记录或分页信息
+            name = local_name(elem.tag)
+            if name == 'Contents':
+                record = {}
+                for child in elem.iter():
+                    tag = local_name(child.tag)
+                    if tag in LISTING_TAGS:
+                        record[tag] = (child.text or '').strip()
+                if record.get('Key'):
+                    records.append(record)
+            elif name == 'CommonPrefixes':
+                for child in elem.iter():
+                    if local_name(child.tag) == 'Prefix' and child.text:
+                        prefixes.append(child.text.strip())
+            else:
+                meta[name] = (elem.text or '').strip()
+            root.clear()
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        handle_events()
+    parser.close()
+    handle_events()
+
+    truncated = meta.get('IsTruncated', '').lower() == 'true'
+    return ListingPage(records, truncated, meta.get('NextMarker') or None,
+                       meta.get('NextContinuationToken') or None, prefixes)
+
+
+class ServerBusyError(requests.exceptions.HTTPError):
+    """服务端错误或限流（可重试）"""
+
+
+class HostUnavailableError(requests.exceptions.ConnectionError):
+    """host连续失败已熔断，请求未发出"""
+
+
+class HostNotFoundError(requests.exceptions.RequestException):
+    """存储桶域名不存在（NXDOMAIN），不重试"""
+
+
+# 列举时值得重试的异常：连接错误、超时、响应中断、服务端错误
+RETRYABLE_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError, ServerBusyError)
+
+
+def fetch_listing_page(session, url, timeout=10):
+    """请求一页列举结果，直接从响应字节流中增量解析
+
+    连接错误、超时和5xx/429按 LISTING_RETRY 退避重试，同一host连续失败后熔断；
+    域名已确认不存在（LISTING_RESOLVER中的NXDOMAIN缓存）时直接抛出HostNotFoundError。
+    """
+    hostname = urlsplit(url).hostname or ''
+
+    def check_hostname():
+        if hostname and LISTING_RESOLVER.is_missing(hostname):
+            raise HostNotFoundError(f"{hostname} 域名不存在（NXDOMAIN）")
+
+    def fetch():
+        try:
+            with session.get(url, timeout=timeout, stream=True) as response:
+                if response.status_code in RETRY_STATUS:
+                    raise ServerBusyError(f"{response.status_code} Server Error for url: {url}", response=response)
+                response.raise_for_status()  # 检查请求是否成功
+                return parse_listing_stream(response.iter_content(chunk_size=64 * 1024))
+        except requests.exceptions.ConnectionError:
+            check_hostname()
+            raise
+
+    check_hostname()
+    host = urlsplit(url).netloc.lower()
+    try:
+        return Retry.call(fetch, LISTING_RETRY, LISTING_BREAKER, host, retry_on=RETRYABLE_ERRORS)
+    except Retry.CircuitOpenError:
+        raise HostUnavailableError(f"{host} 连续请求失败，已暂停访问（熔断中）")
+
+
+def next_page_params(url, page):
+    """根据当前页计算下一页的分页参数，没有下一页时返回None"""
+    if not page.truncated:
+        return None
+
+    # ListObjectsV2 使用 continuation-token 翻页
+    if page.next_token:
+        return {'continuation-token': page.next_token}
+    if dict(parse_qsl(urlsplit(url).query)).get('list-type') == '2':
+        return None
+
+    # ListObjects(V1) 使用 marker 翻页，未返回NextMarker时以本页最后一个Key或公共前缀作为marker
+    last = [page.records[-1]['Key']] if page.records else []
+    marker = page.next_marker or max(last + page.prefixes[-1:], default=None)
+    return {'marker': marker} if marker else None
+
+
+def iter_listing_pages(url, session=None, timeout=10):
+    """分页列举，逐页产出ListingPage
+
+    当前页被消费时，后台线程已经在请求下一页，内存中最多只保留两页数据。
+    """
+    session = session or requests.Session()
+    seen_params = set()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as prefetcher:
+        future = prefetcher.submit(fetch_listing_page, session, url, timeout)
+        while future is not None:
+            page = future.result()
+            future = None
+
+            params = next_page_params(url, page)
+            # 防止服务端返回重复的marker导致死循环
+            if params and tuple(params.items()) not in seen_params:
+                seen_params.add(tuple(params.items()))
+                future = prefetcher.submit(fetch_listing_page, session, build_page_url(url, params), timeout)
+
+            yield page
+
+
+def iter_bucket_listing(url, session=None, timeout=10):
+    """分页列举存储桶，逐条产出对象记录"""
+    for page in iter_listing_pages(url, session, timeout):
+        yield from page.records
+
+
+def iter_fanout_listing(url, depth=1, workers=DEFAULT_FANOUT_WORKERS, session=None, timeout=10):
+    """按前缀分发并行列举单个存储桶，逐条产出对象记录（顺序不固定）
+
+    分页列举必须等上一页的marker，单个前缀只能串行翻页。这里先用 delimiter=/
+    逐层发现公共前缀（共depth层），每层直接位于该前缀下的对象同时产出；
+    到达depth层后，各前缀不带delimiter完整列举，多个前缀并行，结果合并为一个流。
+    """
+    session = session or requests.Session()
+    base_prefix = dict(parse_qsl(urlsplit(url).query)).get('prefix', '')
+    # 每项为一页记录列表，结束标记为None，出错时放入异常
+    pages = queue.Queue(maxsize=workers * 4)
+    stop = threading.Event()
+    lock = threading.Lock()
+    pending = 0
+    futures = []
+
+    def put(item):
+        # 消费者提前退出时不再阻塞
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def submit(prefix, level):
+        nonlocal pending
+        with lock:
+            pending += 1
+            futures.append(executor.submit(list_prefix, prefix, level))
+
+    def list_prefix(prefix, level):
+        nonlocal pending
+        try:
+            if level < depth:
+                prefix_url = build_page_url(url, {'prefix': prefix, 'delimiter': '/'})
+            else:
+                prefix_url = build_page_url(url, {'prefix': prefix}, drop=('delimiter',))
+            for page in iter_listing_pages(prefix_url, session, timeout):
+                if stop.is_set():
+                    return
+                for child in page.prefixes:
+                    submit(child, level + 1)
+                if page.records and not put(page.records):
+                    return
+        except Exception as e:
+            put(e)
+        finally:
+            with lock:
+                pending -= 1
+                finished = pending == 0
+            if finished:
+                put(None)
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    try:
+        submit(base_prefix, 0)
+        while True:
+            item = pages.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield from item
+    finally:
+        stop.set()
+        # 取消尚未开始的前缀（cancel_futures参数需要Python 3.9，逐个取消）
+        with lock:
+            for future in futures:
+                future.cancel()
+        executor.shutdown(wait=False)
+
+
+def list_bucket(url, session=None, timeout=10, fanout_depth=0, fanout_workers=DEFAULT_FANOUT_WORKERS):
+    """列举存储桶：fanout_depth为0时按页串行列举，否则按前缀分发并行列举"""
+    if fanout_depth > 0:
+        return iter_fanout_listing(url, fanout_depth, fanout_workers, session, timeout)
+    return iter_bucket_listing(url, session, timeout)
+
+
+def list_changes(url, store, session=None, **listing_options):
+    """差异模式：列举并与快照比较，只产出新增、变化和已删除的对象（记录中带Change列）
+
+    完整列举后保存新的快照；列举失败或中途停止时丢弃本次结果，快照保持不变。
+    """
+    try:
+        changes = Snapshot.diff_listing(store, url, list_bucket(url, session=session, **listing_options))
+        for change, record in changes:
+            record[DIFF_COLUMN] = change
+            yield record
+    except BaseException:
+        store.discard(url)
+        raise
+    store.finish(url)
+
+
+def print_changes(changes):
+    """输出差异模式的变更统计，changes 为 变更类型 -> 数量"""
+    summary = "，".join(f"{label} {changes.get(change, 0)}" for change, label in Snapshot.CHANGE_LABELS.items())
+    print(f"{Colors.OKBLUE}📊  与上次快照相比：{summary}{Colors.ENDC}")
+
+
+def extract_and_process(output_format="xlsx", fanout_depth=0, fanout_workers=DEFAULT_FANOUT_WORKERS, snapshot=None):
     # 美化欢迎界面
     print(f"\n{Colors.HEADER}" + "*" * 60)
     print(" " * 15 + "URL标签提取与Excel生成工具 v1.0")
@@ -131,78 +398,55 @@ def extract_and_process():
     print(f"\n{Colors.OKBLUE}正在处理，请稍候...{Colors.ENDC}", end="", flush=True)
 
     try:
-        # 发送请求访问URL
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()  # 检查请求是否成功
-
-        # 解析XML内容
-        soup = BeautifulSoup(response.text, 'xml')
-
-        # 提取所有Key标签的内容 - 作为主要数据列表
-        key_tags = soup.find_all('Key')
-        if not key_tags:
+        # 基础URL用于拼接完整链接
+        base_url = bucket_base_url(url)
+
+        # 分页列举（自动跟随marker/continuation-token），每条记录直接写入报告
+        # 指定快照时只写入与上次快照相比新增、变化和已删除的对象
+        writer = None
+        total_items = 0
+        changes = defaultdict(int)
+        try:
+            if snapshot:
+                listing = list_changes(url, snapshot, fanout_depth=fanout_depth, fanout_workers=fanout_workers)
+                columns = RESULT_COLUMNS + [DIFF_COLUMN]
+            else:
+                listing = list_bucket(url, fanout_depth=fanout_depth, fanout_workers=fanout_workers)
+                columns = RESULT_COLUMNS
+            for i, record in enumerate(listing, 1):
+                # 进度提示
+                if i % 100 == 0:
+                    print(f"\r{Colors.OKBLUE}正在处理: 已提取 {i} 条{Colors.ENDC}", end="", flush=True)
+
+                if writer is None:
+                    # 生成基础文件名（包含域名和路径信息），获取唯一文件名
+                    excel_filename = get_unique_filename(create_filename_from_url(url), output_format)
+                    writer = ReportWriter.open_report(excel_filename, columns, center_columns=('序号',))
+
+                if snapshot:
+                    changes[record[DIFF_COLUMN]] += 1
+                item = dict(record)
+                # 添加序号列（从1开始）
+                item['序号'] = i
+                # 生成完整链接作为Host
+                item['Host'] = object_url(base_url, record['Key'])
+
+                writer.write_row(item)
+                total_items = i
+        finally:
+            if writer is not None:
+                writer.close()
+
+        if writer is None:
             print("\r" + " " * 30 + "\r", end="")  # 清除"处理中"提示
             print_separator()
-            print(f"{Colors.WARNING}⚠️  未找到任何<Key>标签内容{Colors.ENDC}")
+            if snapshot:
+                print(f"{Colors.OKGREEN}✅  与上次快照相比没有变化{Colors.ENDC}")
+            else:
+                print(f"{Colors.WARNING}⚠️  未找到任何<Key>标签内容{Colors.ENDC}")
             print_separator()
             return
 
-        # 要提取的标签列表
-        tags_to_extract = ['Key', 'Size', 'Type', 'ID', 'LastModified']
-
-        # 收集所有数据
-        data = []
-        total_items = len(key_tags)
-
-        # 基础URL用于拼接完整链接
-        base_url_match = re.search(r'(https?://[^/]+/)', url)
-        base_url = base_url_match.group(1) if base_url_match else ""
-
-        for i, key_tag in enumerate(key_tags):
-            # 进度提示
-            progress = (i + 1) / total_items * 100
-            print(f"\r{Colors.OKBLUE}正在处理: {progress:.1f}%{Colors.ENDC}", end="", flush=True)
-
-            item = {}
-            # 添加序号列（从1开始）
-            item['序号'] = i + 1
-
-            # 提取Key内容
-            item['Key'] = key_tag.get_text(strip=True)
-
-            # 生成完整链接作为Host
-            item['Host'] = f"{base_url}{item['Key']}" if base_url else item['Key']
-
-            # 提取其他标签（如果存在）
-            for tag in tags_to_extract[1:]:  # 跳过已经处理的Key
-                # 尝试查找当前Key标签后的同级标签
-                tag_element = key_tag.find_next_sibling(tag)
-                # 如果找不到，尝试在整个文档中查找
-                if not tag_element:
-                    tag_element = soup.find(tag)
-                if tag_element:
-                    item[tag] = tag_element.get_text(strip=True)
-
-            data.append(item)
-
-        # 生成基础文件名（包含域名和路径信息）
-        base_filename = create_filename_from_url(url)
-
-        # 获取唯一Excel文件名
-        excel_filename = get_unique_filename(base_filename)
-
-        # 创建DataFrame并保存为Excel
-        df = pd.DataFrame(data)
-        # 确保序号列在最前面
-        if '序号' in df.columns:
-            cols = ['序号'] + [col for col in df.columns if col != '序号']
-            df = df[cols]
-
-        df.to_excel(excel_filename, index=False, sheet_name='Results')
-
-        # 美化Excel表格
-        format_excel(excel_filename)
-
         # 美化输出结果
         print("\r" + " " * 30 + "\r", end="")  # 清除进度提示
         print_separator()
@@ -212,9 +456,11 @@ def extract_and_process():
         print(f"{Colors.BOLD}" + "-" * 40 + f"{Colors.ENDC}")
 
         # 显示提取的列信息
-        columns_info = f"提取的列: {', '.join(df.columns.tolist())}"
+        columns_info = f"提取的列: {', '.join(writer.columns)}"
         print(f"{Colors.OKBLUE}{columns_info}{Colors.ENDC}")
         print(f"{Colors.OKBLUE}📊  统计信息：共提取 {total_items} 条记录{Colors.ENDC}")
+        if snapshot:
+            print_changes(changes)
         print_separator()
 
     except requests.exceptions.RequestException as e:
@@ -229,5 +475,240 @@ def extract_and_process():
         print_separator()
 
 
+def new_shared_session(pool_size):
+    """批量模式共享的会话：所有存储桶复用同一个连接池"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def is_parsable(url):
+    """URL能否解析（如 http://[bad 无法解析，urlsplit会抛出ValueError）"""
+    try:
+        urlsplit(url)
+        return True
+    except ValueError:
+        return False
+
+
+def interleave_by_host(urls):
+    """按host轮流排列，避免同一host的存储桶集中在前面互相等待"""
+    groups = defaultdict(list)
+    for url in urls:
+        groups[urlsplit(url).netloc.lower()].append(url)
+    return [url for batch in zip_longest(*groups.values()) for url in batch if url is not None]
+
+
+class BatchOutput:
+    """批量模式的输出：合并为一个文件，或者每个存储桶一个文件（线程安全）"""
+
+    def __init__(self, output_format, combined, diff=False):
+        self.output_format = output_format
+        self.combined = combined
+        self.extra_columns = [DIFF_COLUMN] if diff else []
+        self.changes = defaultdict(int)
+        self.lock = threading.Lock()
+        self.writers = {}
+        self.reserved = set()
+        self.rows = 0
+
+    def _filename(self, base_name):
+        """唯一文件名：xlsx/parquet在保存时才创建文件，还要避开本次已分配的文件名"""
+        filename = get_unique_filename(base_name, self.output_format)
+        counter = 1
+        while filename in self.reserved:
+            filename = get_unique_filename(f"{base_name}_{counter:02d}", self.output_format)
+            counter += 1
+        self.reserved.add(filename)
+        return filename
+
+    def _writer(self, bucket_url):
+        key = None if self.combined else bucket_url
+        writer = self.writers.get(key)
+        if writer is None:
+            if self.combined:
+                filename = self._filename("batch")
+                writer = ReportWriter.open_report(filename, BATCH_COLUMNS + self.extra_columns,
+                                                  center_columns=('序号',))
+            else:
+                filename = self._filename(create_filename_from_url(bucket_url))
+                writer = ReportWriter.open_report(filename, RESULT_COLUMNS + self.extra_columns,
+                                                  center_columns=('序号',))
+            self.writers[key] = writer
+        return writer
+
+    def write(self, bucket_url, records):
+        """写入一个存储桶的一批记录（记录中已带Host）"""
+        with self.lock:
+            writer = self._writer(bucket_url)
+            for record in records:
+                self.rows += 1
+                record['序号'] = writer.rows_written + 1
+                record['Bucket'] = bucket_url
+                if DIFF_COLUMN in record:
+                    self.changes[record[DIFF_COLUMN]] += 1
+                writer.write_row(record)
+
+    def finish(self, bucket_url):
+        """单独输出时，存储桶列举完成后立即保存文件，返回文件名"""
+        if self.combined:
+            return None
+        with self.lock:
+            writer = self.writers.pop(bucket_url, None)
+        if writer is None:
+            return None
+        writer.close()
+        return writer.path
+
+    def close(self):
+        """保存剩余的文件，返回文件名列表"""
+        with self.lock:
+            writers, self.writers = list(self.writers.values()), {}
+        for writer in writers:
+            writer.close()
+        return [writer.path for writer in writers]
+
+
+def list_bucket_into(bucket_url, session, output, batch_size=1000, snapshot=None, **listing_options):
+    """列举单个存储桶并分批写入输出，返回对象数（指定快照时为变更的对象数）"""
+    base_url = bucket_base_url(bucket_url)
+    batch = []
+    total = 0
+    if snapshot:
+        listing = list_changes(bucket_url, snapshot, session=session, **listing_options)
+    else:
+        listing = list_bucket(bucket_url, session=session, **listing_options)
+    for record in listing:
+        record['Host'] = object_url(base_url, record['Key'])
+        batch.append(record)
+        if len(batch) >= batch_size:
+            output.write(bucket_url, batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        output.write(bucket_url, batch)
+        total += len(batch)
+    return total
+
+
+def run_batch(batch_file, output_format="xlsx", workers=DEFAULT_BATCH_WORKERS, per_host=DEFAULT_PER_HOST,
+              combined=False, fanout_depth=0, fanout_workers=DEFAULT_FANOUT_WORKERS,
+              dns_workers=Resolver.DEFAULT_WORKERS, snapshot=None):
+    """批量模式：并发列举文件中的所有存储桶，同一host同时列举的存储桶数有上限"""
+    print(f"\n{Colors.HEADER}" + "*" * 60)
+    print(" " * 15 + "URL标签提取与Excel生成工具 v1.0（批量模式）")
+    print("*" * 60 + f"{Colors.ENDC}")
+
+    try:
+        bucket_urls = list(dict.fromkeys(UrlSource.iter_urls(batch_file)))
+    except OSError as e:
+        print(f"{Colors.FAIL}❌  读取 {batch_file} 时出错: {str(e)}{Colors.ENDC}")
+        return
+    # 无法解析的行单独报错跳过，不影响其他存储桶
+    for url in bucket_urls:
+        if not is_parsable(url):
+            print(f"{Colors.FAIL}❌  无法解析的存储桶URL，已跳过: {url}{Colors.ENDC}")
+    bucket_urls = interleave_by_host(url for url in bucket_urls if is_parsable(url))
+    if not bucket_urls:
+        print(f"{Colors.WARNING}⚠️  {batch_file} 中没有存储桶URL{Colors.ENDC}")
+        return
+
+    # 先并发预解析所有存储桶域名，域名不存在的存储桶不再发送请求
+    # IP地址不需要解析，不计入域名数
+    hosts = dict.fromkeys(host for host in (urlsplit(url).hostname for url in bucket_urls)
+                          if host and not Resolver.is_ip(host))
+    resolved, missing, failed = LISTING_RESOLVER.prefetch(hosts, dns_workers)
+    print(f"\n{Colors.OKBLUE}DNS预解析: {len(hosts)} 个域名，解析成功 {resolved}，"
+          f"域名不存在 {missing}，临时失败 {failed}{Colors.ENDC}")
+
+    workers = max(1, min(workers, len(bucket_urls)))
+    print(f"\n{Colors.OKBLUE}共 {len(bucket_urls)} 个存储桶，同时列举 {workers} 个，"
+          f"同一host最多 {per_host} 个{Colors.ENDC}")
+
+    # 每个存储桶列举时还有一个预取线程，连接池按两倍大小分配（前缀分发时再乘以每个桶的并行前缀数）
+    session = new_shared_session(workers * 2 * (fanout_workers if fanout_depth > 0 else 1))
+    output = BatchOutput(output_format, combined, diff=snapshot is not None)
+    host_slots = defaultdict(lambda: threading.BoundedSemaphore(per_host))
+    slots_lock = threading.Lock()
+
+    def list_one(bucket_url):
+        with slots_lock:
+            slot = host_slots[urlsplit(bucket_url).netloc.lower()]
+        with slot:
+            count = list_bucket_into(bucket_url, session, output, snapshot=snapshot, fanout_depth=fanout_depth,
+                                     fanout_workers=fanout_workers)
+        return count, output.finish(bucket_url)
+
+    succeeded = failed = 0
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(list_one, url): url for url in bucket_urls}
+            for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                url = futures[future]
+                prefix = f"[{done}/{len(bucket_urls)}]"
+                try:
+                    count, filename = future.result()
+                    succeeded += 1
+                    saved = f" → {filename}" if filename else ""
+                    print(f"{Colors.OKGREEN}✅  {prefix} {url}: {count} 条记录{saved}{Colors.ENDC}")
+                except requests.exceptions.RequestException as e:
+                    failed += 1
+                    print(f"{Colors.FAIL}❌  {prefix} {url}: 访问出错 {str(e)[:80]}{Colors.ENDC}")
+                except Exception as e:
+                    failed += 1
+                    print(f"{Colors.FAIL}❌  {prefix} {url}: 处理出错 {str(e)[:80]}{Colors.ENDC}")
+    finally:
+        files = output.close()
+        session.close()
+
+    print_separator()
+    print(f"{Colors.OKBLUE}📊  统计信息：成功 {succeeded} 个存储桶，失败 {failed} 个，共提取 {output.rows} 条记录{Colors.ENDC}")
+    if snapshot:
+        print_changes(output.changes)
+    if combined and files:
+        print(f"📊  结果已保存至：{Colors.UNDERLINE}{files[0]}{Colors.ENDC}")
+    print_separator()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="URL标签提取与Excel生成工具")
+    parser.add_argument("--format", choices=ReportWriter.REPORT_FORMATS, default="xlsx",
+                        help="结果文件格式（默认xlsx，parquet需要pyarrow）")
+    parser.add_argument("--batch", default=None,
+                        help="批量模式：从文件读取存储桶URL（每行一个，支持.gz），并发列举")
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_BATCH_WORKERS,
+                        help=f"批量模式同时列举的存储桶数（默认{DEFAULT_BATCH_WORKERS}）")
+    parser.add_argument("--per-host", type=int, default=DEFAULT_PER_HOST,
+                        help=f"批量模式同一host同时列举的存储桶数（默认{DEFAULT_PER_HOST}）")
+    parser.add_argument("--combined", action="store_true",
+                        help="批量模式把所有存储桶的结果合并到一个文件（默认每个存储桶一个文件）")
+    parser.add_argument("--retries", type=int, default=Retry.DEFAULT_RETRIES,
+                        help=f"列举请求遇到连接错误、超时、5xx/429时的重试次数（默认{Retry.DEFAULT_RETRIES}）")
+    parser.add_argument("--fanout-depth", type=int, default=0,
+                        help="前缀分发：先用 delimiter=/ 发现几层公共前缀，再并行列举各前缀（默认0，按页串行列举）")
+    parser.add_argument("--fanout-workers", type=int, default=DEFAULT_FANOUT_WORKERS,
+                        help=f"前缀分发时每个存储桶同时列举的前缀数（默认{DEFAULT_FANOUT_WORKERS}）")
+    parser.add_argument("--dns-workers", type=int, default=Resolver.DEFAULT_WORKERS,
+                        help=f"批量模式预解析存储桶域名时同时进行的DNS查询数（默认{Resolver.DEFAULT_WORKERS}）")
+    parser.add_argument("--snapshot", default=None,
+                        help="差异模式：列举快照文件（SQLite），只输出与上次快照相比新增、变化和已删除的对象，"
+                             "完整列举后更新快照")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    extract_and_process()
+    args = parse_args()
+    LISTING_RETRY.retries = max(0, args.retries)
+    Resolver.install(LISTING_RESOLVER)
+    snapshot = Snapshot.SnapshotStore(args.snapshot) if args.snapshot else None
+    try:
+        if args.batch:
+            run_batch(args.batch, args.format, args.workers, args.per_host, args.combined,
+                      args.fanout_depth, args.fanout_workers, args.dns_workers, snapshot)
+        else:
+            extract_and_process(args.format, args.fanout_depth, args.fanout_workers, snapshot)
+    finally:
+        if snapshot:
+            snapshot.close()
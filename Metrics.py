@@ -0,0 +1,167 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 直方图桶上限（秒），与Prometheus默认桶相近，覆盖0.1ms到30s
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 请求各阶段：限速等待、DNS、建连（TCP，http引擎含TLS）、TLS握手、首字节、下载响应体、
+# 页面渲染（仅selenium）、分类，以及单个URL的总耗时
+PHASES = ("ratelimit_wait", "dns", "connect", "tls", "ttfb", "download", "render", "classify", "total")
+
+# 所有host汇总使用的标签
+ALL_HOSTS = "*"
+
+
+class Histogram:
+    """累积直方图，记录次数、总和和各桶计数"""
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                break
+        else:
+            i = len(BUCKETS)
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """按桶线性插值估计分位数"""
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        lower = 0.0
+        for i, n in enumerate(self.counts):
+            upper = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+            if cumulative + n >= target and n:
+                return lower + (upper - lower) * (target - cumulative) / n
+            cumulative += n
+            lower = upper
+        return BUCKETS[-1]
+
+
+class RequestMetrics:
+    """按host和阶段聚合的请求耗时直方图及结果计数（线程安全）"""
+
+    def __init__(self):
+        self._histograms = {}  # (host, phase) -> Histogram
+        self._outcomes = {}  # (host, verdict) -> 次数
+        self._lock = threading.Lock()
+        self._server = None
+
+    def observe(self, host, phases):
+        """记录一个请求的各阶段耗时（秒），同时计入所有host的汇总"""
+        with self._lock:
+            for phase, seconds in phases.items():
+                if seconds is None or seconds < 0:
+                    continue
+                for label in (host, ALL_HOSTS):
+                    histogram = self._histograms.get((label, phase))
+                    if histogram is None:
+                        histogram = self._histograms[(label, phase)] = Histogram()
+                    histogram.observe(seconds)
+
+    def count(self, host, verdict):
+        with self._lock:
+            for label in (host, ALL_HOSTS):
+                self._outcomes[(label, verdict)] = self._outcomes.get((label, verdict), 0) + 1
+
+    def summary(self, host=ALL_HOSTS):
+        """某个host各阶段的次数、平均值、p50、p99（秒）"""
+        with self._lock:
+            rows = {}
+            for phase in PHASES:
+                histogram = self._histograms.get((host, phase))
+                if histogram and histogram.count:
+                    rows[phase] = {
+                        "count": histogram.count,
+                        "mean": histogram.sum / histogram.count,
+                        "p50": histogram.quantile(0.5),
+                        "p99": histogram.quantile(0.99),
+                    }
+            return rows
+
+    def to_json(self):
+        with self._lock:
+            hosts = sorted({host for host, _ in self._histograms})
+        data = {
+            "phases": {host: self.summary(host) for host in hosts},
+            "outcomes": {},
+        }
+        with self._lock:
+            for (host, verdict), n in sorted(self._outcomes.items()):
+                data["outcomes"].setdefault(host, {})[verdict] = n
+        return json.dumps(data, ensure_ascii=False, indent=2)
+
+    def to_prometheus(self):
+        """Prometheus文本格式"""
+        lines = ["# HELP oss_checker_phase_seconds Per-request phase duration.",
+                 "# TYPE oss_checker_phase_seconds histogram"]
+        with self._lock:
+            for (host, phase), histogram in sorted(self._histograms.items()):
+                labels = f'host="{_escape(host)}",phase="{phase}"'
+                cumulative = 0
+                for bound, n in zip(BUCKETS, histogram.counts):
+                    cumulative += n
+                    lines.append(f'oss_checker_phase_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'oss_checker_phase_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'oss_checker_phase_seconds_sum{{{labels}}} {histogram.sum:.6f}')
+                lines.append(f'oss_checker_phase_seconds_count{{{labels}}} {histogram.count}')
+
+            lines.append("# HELP oss_checker_results_total Classified URLs by verdict.")
+            lines.append("# TYPE oss_checker_results_total counter")
+            for (host, verdict), n in sorted(self._outcomes.items()):
+                lines.append(f'oss_checker_results_total{{host="{_escape(host)}",verdict="{verdict}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """导出到文件：.json为JSON摘要，其他扩展名为Prometheus文本"""
+        content = self.to_json() if path.lower().endswith(".json") else self.to_prometheus()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def serve(self, port, host="127.0.0.1"):
+        """在后台线程中提供 /metrics（Prometheus）和 /metrics.json"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.startswith("/metrics.json"):
+                    body, content_type = metrics.to_json(), "application/json"
+                elif self.path.startswith("/metrics"):
+                    body, content_type = metrics.to_prometheus(), "text/plain; version=0.0.4"
+                else:
+                    self.send_error(404)
+                    return
+                body = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[1]
+
+    def close(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"')
@@ -6,19 +6,8 @@ echo.
 python3 banner.py
 echo.
 
-::demo url
-python3 KeyExtract.py
-echo.
-
-::extract the Hosts of Excel
-python3 ExtractHost.py
-echo.
-
-:delete 
-del /q "*result*.xlsx"
-echo.
-
-::Checking
-python3 OSSURLChecker.py
+::list the bucket and check every object URL in one pass
+::(KeyExtract.py / ExtractHost.py / OSSURLChecker.py can still be run step by step)
+python3 Pipeline.py
 echo.
 pause
\ No newline at end of file
@@ -1,15 +1,68 @@
 import os
-import time
+import glob
+import itertools
+import zlib
 import random
-import pandas as pd
+import argparse
 import concurrent.futures
 import logging
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.common.exceptions import *
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
+import collections
+import socket
+import threading
+import time
 from functools import lru_cache  # 新增：用于缓存
+from urllib.parse import urlsplit
+
+import EventSink
+import HttpProbe
+import Metrics
+import Priority
+import RateLimiter
+import RunJournal
+import ResultCache
+import Resolver
+import Results
+import Retry
+import ReportWriter
+import Sampling
+import Snapshot
+import UrlSource
+
+# psutil 为可选依赖，用于按内存占用回收浏览器
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Selenium 为可选后端，仅在 --engine selenium 时需要
+try:
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    from selenium.common.exceptions import TimeoutException, WebDriverException
+except ImportError:
+    webdriver = None
+
+    class WebDriverException(Exception):
+        pass
+
+    class TimeoutException(WebDriverException):
+        pass
+
+
+# 有效URL报告的列及Excel列宽
+REPORT_COLUMNS = ["序号", "url", "Code", "Message", "Resource", "RequestId"]
+REPORT_COLUMN_WIDTHS = {
+    "A": 8,  # 序号
+    "B": 40,  # URL
+    "C": 10,  # Code
+    "D": 30,  # Message
+    "E": 20,  # Resource
+    "F": 30,  # RequestId
+    "G": 8  # 变更（差异模式）
+}
+# 差异模式下报告额外记录对象相对上次快照的变更（新增/变化）
+CHANGE_COLUMN = "变更"
 
 
 # 颜色代码定义
@@ -25,8 +78,8 @@ class Color:
 
 
 def print_status(message, color=Color.RESET, end='\n'):
-    """带颜色的状态输出"""
-    print(f"{color}{message}{Color.RESET}", end=end)
+    """带颜色的状态输出（经由OUTPUT统一写出，不会与其他线程的输出交错）"""
+    OUTPUT.message(f"{color}{message}{Color.RESET}", end=end)
 
 
 @lru_cache(maxsize=None)  # 新增：缓存用户代理列表
@@ -41,6 +94,10 @@ def get_user_agents():
 
 def create_driver():
     """创建无头Chrome浏览器驱动，优化启动参数"""
+    if webdriver is None:
+        print_status("创建浏览器驱动失败: 未安装selenium，请使用 --engine http 或安装selenium", Color.RED)
+        return None
+
     # 禁用Selenium的日志输出
     logging.getLogger('selenium').setLevel(logging.CRITICAL)
 
@@ -85,8 +142,39 @@ def create_driver():
         return None
 
 
-def extract_info(driver, url):
+def navigation_phases(driver):
+    """从浏览器的Navigation Timing读取本次页面加载各阶段耗时（秒）"""
+    try:
+        timing = driver.execute_script("return window.performance.timing.toJSON();")
+    except Exception:
+        return {}
+    if not timing or not timing.get("responseEnd"):
+        return {}
+
+    def span(begin, end):
+        if not timing.get(begin) or not timing.get(end):
+            return None
+        return (timing[end] - timing[begin]) / 1000.0
+
+    phases = {
+        "dns": span("domainLookupStart", "domainLookupEnd"),
+        "connect": span("connectStart", "connectEnd"),
+        "ttfb": span("requestStart", "responseStart"),
+        "download": span("responseStart", "responseEnd"),
+        "render": span("responseEnd", "loadEventEnd"),
+    }
+    # secureConnectionStart为0表示没有TLS握手
+    if timing.get("secureConnectionStart"):
+        phases["tls"] = span("secureConnectionStart", "connectEnd")
+        phases["connect"] = span("connectStart", "secureConnectionStart")
+    return phases
+
+
+def extract_info(driver, url, limiter=None, metrics=None):
     """优化信息提取逻辑，减少不必要操作"""
+    phases = {}
+    start = time.perf_counter()
+    loaded = None
     result = {
         "url": url,
         "Code": "",
@@ -98,26 +186,35 @@ def extract_info(driver, url):
     }
 
     try:
-        # 减少随机延迟范围（从1-3秒改为0.5-1.5秒）
-        time.sleep(random.uniform(0.5, 1.5))
+        # 按host限速，替代固定的随机延迟
+        if limiter:
+            limiter.acquire(url)
+        if metrics:
+            phases["ratelimit_wait"] = time.perf_counter() - start
 
         driver.get(url)
-        page_source = driver.page_source.lower()
+        if metrics:
+            loaded = time.perf_counter()
+            phases.update(navigation_phases(driver))
+        # 一次扫描匹配所有错误标记，不再复制整个页面做lower()
+        markers = HttpProbe.find_markers(driver.page_source)
+
+        if limiter:
+            if "throttled" in markers:
+                limiter.on_throttle(url)
+            else:
+                limiter.on_success(url)
 
         # 先检查关键错误状态，快速返回
-        if "not exist" in page_source:
+        if "missing" in markers:
             result["valid"] = False
-            print_status(f"❌ 无效 URL: {url}", Color.RED)
             return result
 
-        if "access denied" in page_source:
+        if "denied" in markers:
             result["valid"] = False
             result["access_denied"] = True
-            print_status(f"🚫 访问拒绝: {url}", Color.YELLOW)
             return result
 
-        print_status(f"✅ 有效 URL: {url}", Color.GREEN)
-
         # 优化XPath提取逻辑，使用更高效的选择器
         xpath_map = {
             "Code": "//*[contains(text(), 'Code')]/following-sibling::*",
@@ -137,60 +234,212 @@ def extract_info(driver, url):
     except TimeoutException:
         result["Message"] = "Timeout"
         result["valid"] = False
-        print_status(f"⏱️ 超时 URL: {url}", Color.YELLOW)
     except WebDriverException as e:
         result["Message"] = f"Error: {str(e)}"
         result["valid"] = False
-        print_status(f"⚠️ 错误 URL: {url} ({str(e)})", Color.YELLOW)
     except Exception as e:
         result["Message"] = f"Unexpected error: {str(e)}"
         result["valid"] = False
-        print_status(f"⚠️ 异常 URL: {url} ({str(e)})", Color.YELLOW)
+    finally:
+        if metrics:
+            if loaded:
+                phases["classify"] = time.perf_counter() - loaded
+            phases["total"] = time.perf_counter() - start
+            host = RateLimiter.host_of(url)
+            metrics.observe(host, phases)
+            metrics.count(host, HttpProbe.verdict_of(result))
 
     return result
 
 
 # 新增：驱动池管理类，复用浏览器实例
 class DriverPool:
-    def __init__(self, max_drivers=5):
+    """线程安全的有界驱动池
+
+    - 借出时阻塞等待空闲驱动，超时返回None，不会超出上限额外创建浏览器
+    - 没有存活或正在创建的驱动（如Chrome/chromedriver不可用）时立即返回None，不再等待
+    - 归还时检查存活，崩溃或卡死的驱动直接销毁并补充新的
+    - 加载页面数或内存占用超过阈值后自动回收重建
+    """
+
+    def __init__(self, max_drivers=5, checkout_timeout=60, max_pages=200, max_rss_mb=1024):
         self.max_drivers = max_drivers
-        self.drivers = []
+        self.checkout_timeout = checkout_timeout
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self._idle = collections.deque()
+        self._pages = {}  # id(driver) -> 已加载页面数
+        self._live = 0  # 当前存活（空闲+借出+正在创建）的驱动数
+        self._lock = threading.Lock()
+        # 有驱动归还、名额释放或创建失败时唤醒等待借出的线程
+        self._available = threading.Condition(self._lock)
+        self._closed = False
         self._initialize_drivers()
 
     def _initialize_drivers(self):
-        for _ in range(self.max_drivers):
+        """并行启动所有浏览器，避免串行等待Chrome启动"""
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_drivers) as executor:
+            for _ in range(self.max_drivers):
+                executor.submit(self._replenish)
+
+    def _spawn(self):
+        """在不超过上限的前提下创建一个新驱动"""
+        with self._lock:
+            if self._closed or self._live >= self.max_drivers:
+                return None
+            self._live += 1
+
+        try:
             driver = create_driver()
-            if driver:
-                self.drivers.append(driver)
+        except Exception as e:
+            print_status(f"创建浏览器驱动失败: {str(e)}", Color.RED)
+            driver = None
+        with self._lock:
+            if driver is None:
+                self._live -= 1
+                self._available.notify_all()
+                return None
+            self._pages[id(driver)] = 0
+        return driver
 
-    def get_driver(self):
-        if not self.drivers:
-            return create_driver()
-        return self.drivers.pop()
+    def _put_idle(self, driver):
+        with self._lock:
+            self._idle.append(driver)
+            self._available.notify()
 
-    def return_driver(self, driver):
-        if len(self.drivers) < self.max_drivers:
-            self.drivers.append(driver)
-        else:
+    def _replenish(self):
+        driver = self._spawn()
+        if driver:
+            self._put_idle(driver)
+
+    def _discard(self, driver):
+        with self._lock:
+            self._pages.pop(id(driver), None)
+            self._live -= 1
+            self._available.notify_all()
+        try:
             driver.quit()
+        except Exception:
+            pass
+
+    def _is_alive(self, driver):
+        """检查chromedriver进程和浏览器会话是否仍然可用"""
+        try:
+            process = driver.service.process
+            if process is not None and process.poll() is not None:
+                return False
+            driver.current_url  # 向浏览器发送一次命令，会话失效时抛出异常
+            return True
+        except Exception:
+            return False
+
+    def _rss_mb(self, driver):
+        """chromedriver及其所有子进程（Chrome）占用的内存，未安装psutil时返回0"""
+        if psutil is None:
+            return 0
+        try:
+            process = psutil.Process(driver.service.process.pid)
+            processes = [process] + process.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes) / 1024 / 1024
+        except Exception:
+            return 0
+
+    def _needs_recycle(self, driver, pages):
+        if self.max_pages and pages >= self.max_pages:
+            return True
+        # 内存检查开销较大，每10个页面检查一次
+        return bool(self.max_rss_mb) and pages % 10 == 0 and self._rss_mb(driver) > self.max_rss_mb
 
-    def close_all(self):
-        for driver in self.drivers:
-            driver.quit()
-        self.drivers = []
+    def get_driver(self):
+        """借出一个驱动，等待超时或无法创建驱动时返回None"""
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            with self._lock:
+                if self._idle:
+                    return self._idle.popleft()
+
+            # 启动失败或被回收的名额在这里补上
+            driver = self._spawn()
+            if driver:
+                return driver
+
+            with self._lock:
+                if self._idle:
+                    return self._idle.popleft()
+                if self._closed or self._live == 0:
+                    # 创建失败且没有其他驱动可以等待
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._available.wait(remaining)
+
+        print_status(f"⚠️ 等待浏览器驱动超时（{self.checkout_timeout}秒）", Color.YELLOW)
+        return None
 
+    def return_driver(self, driver, healthy=True):
+        """归还驱动，异常、超限或已关闭时销毁并补充新驱动"""
+        with self._lock:
+            pages = self._pages.get(id(driver), 0) + 1
+            self._pages[id(driver)] = pages
+
+        if self._closed:
+            self._discard(driver)
+        elif not healthy or not self._is_alive(driver) or self._needs_recycle(driver, pages):
+            self._discard(driver)
+            self._replenish()
+        else:
+            self._put_idle(driver)
 
-def process_url(url, driver_pool):
-    """使用驱动池处理单个URL，复用浏览器实例"""
-    driver = driver_pool.get_driver()
-    if not driver:
-        return None
+    def close_all(self):
+        with self._lock:
+            self._closed = True
+            drivers = list(self._idle)
+            self._idle.clear()
+            self._available.notify_all()
+        for driver in drivers:
+            self._discard(driver)
+
+
+def process_url(url, driver_pool, limiter=None, cache=None, metrics=None, retry=None, breaker=None,
+                resolver=None):
+    """使用驱动池处理单个URL，复用浏览器实例
+
+    超时和WebDriver异常按重试策略换一个浏览器重试，host熔断期间直接返回错误结果。
+    指定resolver时先查共享DNS缓存，域名不存在的URL不再打开浏览器。
+    """
+    # 浏览器无法发送条件请求，只使用有效期内的缓存
+    entry = cache.get(url) if cache else None
+    if entry and entry.fresh:
+        return entry.result
+
+    if resolver and host_missing(url, resolver):
+        return HttpProbe.nxdomain_result(url)
+
+    def attempt():
+        driver = driver_pool.get_driver()
+        if not driver:
+            return None
+
+        healthy = False
+        try:
+            result = extract_info(driver, url, limiter, metrics)
+            # 超时或WebDriver异常后的浏览器状态不可靠，归还时直接回收
+            healthy = not (result["Message"] == "Timeout" or result["Message"].startswith("Error: "))
+            return result
+        finally:
+            driver_pool.return_driver(driver, healthy)
 
     try:
-        return extract_info(driver, url)
-    finally:
-        if driver:
-            driver_pool.return_driver(driver)
+        result = Retry.call(attempt, retry, breaker, RateLimiter.host_of(url),
+                            should_retry=lambda r: r is not None and HttpProbe.is_retryable(r),
+                            is_host_failure=lambda r: r is not None and HttpProbe.is_host_failure(r))
+    except Retry.CircuitOpenError:
+        result = HttpProbe.error_result(url, Retry.CIRCUIT_OPEN_MESSAGE)
+
+    if cache and result and not HttpProbe.is_error(result):
+        cache.put(result)
+    return result
 
 
 def create_unique_filename(base_name, extension):
@@ -205,151 +454,701 @@ def create_unique_filename(base_name, extension):
     return filename
 
 
-def format_excel(file_path):
-    """优化Excel格式化逻辑"""
-    try:
-        from openpyxl import load_workbook
-        wb = load_workbook(file_path)
-        ws = wb.active
-
-        # 设置样式（保持不变）
-        header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-        header_font = Font(color="FFFFFF", bold=True)
-        header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
+def is_valid(result):
+    return bool(result) and result["valid"] and not result["access_denied"]
+
 
-        # 格式化标题行
-        for cell in ws[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = header_alignment
-            cell.border = thin_border
-
-        # 优化数据行处理：只处理有值的单元格
-        for row in ws.iter_rows(min_row=2, max_row=ws.max_row):
-            for cell in row:
-                if cell.value is not None:  # 只处理有值的单元格
-                    cell.border = thin_border
-                    cell.alignment = Alignment(wrap_text=True)
-
-        # 调整列宽
-        column_widths = {
-            "A": 8,  # 序号
-            "B": 40,  # URL
-            "C": 10,  # Code
-            "D": 30,  # Message
-            "E": 20,  # Resource
-            "F": 30  # RequestId
-        }
+class ValidReport:
+    """有效URL报告：收到第一个有效结果时才创建文件，之后逐行流式写入"""
+
+    def __init__(self, fmt="xlsx", diff=False):
+        self.fmt = fmt
+        self.columns = REPORT_COLUMNS + [CHANGE_COLUMN] if diff else REPORT_COLUMNS
+        self.writer = None
+        self.error = None
+
+    def add(self, result):
+        if self.error:
+            return
+        try:
+            if self.writer is None:
+                path = create_unique_filename("result", self.fmt)
+                self.writer = ReportWriter.open_report(path, self.columns,
+                                                       column_widths=REPORT_COLUMN_WIDTHS, wrap_text=True)
+            row = dict(result)
+            row["序号"] = self.writer.rows_written + 1
+            if result.get("change"):
+                row[CHANGE_COLUMN] = Snapshot.CHANGE_LABELS.get(result["change"], result["change"])
+            self.writer.write_row(row)
+        except Exception as e:
+            self.error = e
+
+    def close(self):
+        """保存报告，返回文件路径（没有有效结果时返回None）"""
+        if self.writer is None:
+            return None
+        try:
+            self.writer.close()
+        except Exception as e:
+            self.error = e
+        return self.writer.path
+
+
+def format_result(result):
+    """单个检测结果的彩色输出行"""
+    url = result["url"]
+    if result.get("inferred"):
+        url += " (按存储桶推断)"
+    if result["access_denied"]:
+        return f"{Color.YELLOW}🚫 访问拒绝: {url}{Color.RESET}"
+    if result["valid"]:
+        return f"{Color.GREEN}✅ 有效 URL: {url}{Color.RESET}"
+    if HttpProbe.is_error(result):
+        return f"{Color.YELLOW}⚠️ 错误 URL: {url} ({result['Message']}){Color.RESET}"
+    return f"{Color.RED}❌ 无效 URL: {url}{Color.RESET}"
+
+
+def format_progress(processed, total_urls, rate, eta):
+    """检测进度条（总数未知时只显示已完成数量），附带吞吐量和预计剩余时间"""
+    speed = f" {rate:.1f}个/秒"
+    if eta is not None:
+        speed += f" 剩余 {EventSink.format_duration(eta)}"
+    if not total_urls:
+        return f"{Color.BLUE}检测进度: 已完成 {processed} 个URL{speed}{Color.RESET}"
+    percentage = (processed / total_urls) * 100
+    bar_length = 50
+    filled_length = int(bar_length * processed // total_urls)
+    bar = '█' * filled_length + '-' * (bar_length - filled_length)
+    return f"{Color.BLUE}检测进度: |{bar}| {percentage:.1f}% ({processed}/{total_urls}){speed}{Color.RESET}"
+
+
+# 控制台输出：单线程批量写出，进度限频刷新（main中按 --output 重新创建）
+OUTPUT = EventSink.EventSink(formatter=format_result, progress_formatter=format_progress)
+
+
+def start_output(mode="text"):
+    """按输出模式创建并启动控制台输出"""
+    global OUTPUT
+    OUTPUT.close()
+    OUTPUT = EventSink.EventSink(mode, formatter=format_result, progress_formatter=format_progress).start()
+    return OUTPUT
+
+
+def stop_output():
+    """写出剩余的输出并停止写入线程"""
+    OUTPUT.close()
+
+
+def finish_progress():
+    """检测结束，输出最终进度"""
+    OUTPUT.end_progress()
+
+
+def print_result(result):
+    """输出单个检测结果（在主线程的结果回调中统一输出）"""
+    OUTPUT.result(result)
+
+
+def print_progress(processed, total_urls):
+    """更新检测进度，由OUTPUT限频重绘"""
+    OUTPUT.progress(processed, total_urls)
+
+
+def run_selenium(urls, max_workers, limiter, cache, on_result, metrics=None, retry=None, breaker=None,
+                 resolver=None, **pool_options):
+    """Selenium后端：驱动池 + 线程池逐个加载页面
+
+    URL从迭代器中按需取出，同时提交的任务不超过线程数的两倍，内存占用与输入规模无关。
+    """
+    driver_pool = DriverPool(max_drivers=max_workers, **pool_options)  # 创建驱动池
+    window = max_workers * 2
+
+    def deliver(futures):
+        for future in futures:
+            try:
+                on_result(future.result())
+            except Exception as e:
+                print_status(f"\n处理URL时出错: {str(e)}", Color.RED)
 
-        for col in column_widths:
-            ws.column_dimensions[col].width = column_widths[col]
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = set()
+            try:
+                for url in urls:
+                    if len(pending) >= window:
+                        finished, pending = concurrent.futures.wait(
+                            pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                        deliver(finished)
+                    # 使用驱动池处理URL
+                    pending.add(executor.submit(process_url, url, driver_pool, limiter, cache, metrics,
+                                                 retry, breaker, resolver))
+                deliver(concurrent.futures.as_completed(pending))
+            except KeyboardInterrupt:
+                # 取消尚未开始的任务，只等待正在加载的页面（cancel_futures参数需要Python 3.9，逐个取消）
+                for future in pending:
+                    future.cancel()
+                executor.shutdown(wait=False)
+                raise
+    finally:
+        # 关闭所有驱动
+        driver_pool.close_all()
 
-        wb.save(file_path)
-        return True
-    except Exception as e:
-        print_status(f"格式化Excel时出错: {str(e)}", Color.RED)
-        return False
 
+def run_http(urls, concurrency, timeout, limiter, cache, on_result, metrics=None, method="range",
+             prefix_bytes=HttpProbe.DEFAULT_PREFIX_BYTES, retry=None, breaker=None, resolver=None):
+    """HTTP后端：异步直接请求OSS，只读取响应前缀，根据状态码和错误XML分类"""
+    HttpProbe.run_probe(urls, on_result, concurrency=concurrency, timeout=timeout,
+                        user_agent=random.choice(get_user_agents()), limiter=limiter, cache=cache,
+                        metrics=metrics, method=method, prefix_bytes=prefix_bytes, retry=retry, breaker=breaker,
+                        resolver=resolver)
 
-def main():
-    print_status("\n" + "=" * 60, Color.CYAN)
-    print_status(f"{Color.BOLD}                      URL批量检测工具                      {Color.RESET}", Color.CYAN)
-    print_status(f"{Color.BOLD}                     (OSS URL Checker)                    {Color.RESET}", Color.CYAN)
-    print_status("=" * 60 + "\n", Color.CYAN)
 
-    # 读取URL列表
+def host_missing(url, resolver):
+    """解析URL的主机名（优先使用共享缓存），域名不存在时返回True，临时解析失败交给检测引擎处理"""
     try:
-        with open("url.txt", "r", encoding="utf-8") as f:
-            urls = [line.strip() for line in f if line.strip()]
-    except FileNotFoundError:
-        print_status("错误: 未找到url.txt文件", Color.RED)
-        return
-    except Exception as e:
-        print_status(f"读取url.txt时出错: {str(e)}", Color.RED)
-        return
+        host = urlsplit(url).hostname
+    except ValueError:
+        return False
+    if not host or Resolver.is_ip(host):
+        return False
+    try:
+        resolver.resolve(host)
+    except socket.gaierror:
+        return resolver.is_missing(host)
+    except (OSError, UnicodeError):
+        pass
+    return False
+
+
+def dns_prefetch(urls, resolver, workers):
+    """对输入中去重后的主机名并发预解析，结果（包括域名不存在）写入共享DNS缓存
+
+    IP地址不需要解析；无法解析的URL跳过，由检测引擎记录为错误。
+    """
+    hosts = {}
+    for url in urls:
+        try:
+            host = urlsplit(url).hostname
+        except ValueError:
+            continue
+        if host and not Resolver.is_ip(host):
+            hosts[host] = None
+    start = time.perf_counter()
+    resolved, missing, failed = resolver.prefetch(hosts, workers)
+    print_status(f"DNS预解析: {len(hosts)} 个主机名，解析成功 {resolved}，域名不存在 {missing}，"
+                 f"临时失败 {failed}（耗时 {time.perf_counter() - start:.1f} 秒）", Color.BLUE)
+
+
+def bucket_prepass(urls, concurrency, timeout, limiter, resolver=None):
+    """按存储桶分组，每个桶只探测一次，返回 根地址 -> (结论, 错误信息)
+
+    只遍历一遍URL收集存储桶根地址，不保存URL本身。
+    """
+    roots = {}
+    count = 0
+    for url in urls:
+        count += 1
+        try:
+            roots[HttpProbe.bucket_root(url)] = None
+        except ValueError:
+            # 无法解析的URL不属于任何存储桶，仍交给检测引擎记录为错误
+            continue
+    print_status(f"存储桶预检: {count} 个URL分属 {len(roots)} 个存储桶", Color.BLUE)
+    if not roots:
+        return {}
+    verdicts = HttpProbe.run_bucket_probe(list(roots), concurrency=min(concurrency, len(roots)), timeout=timeout,
+                                          user_agent=random.choice(get_user_agents()), limiter=limiter,
+                                          resolver=resolver)
+    dead = sum(1 for verdict, _ in verdicts.values() if verdict == HttpProbe.BUCKET_DEAD)
+    print_status(f"不存在的存储桶: {dead}，禁止列举的存储桶: {len(verdicts) - dead}", Color.BLUE)
+    return verdicts
+
+
+def skip_inferred(urls, verdicts, on_result):
+    """不存在或私有的桶下的URL直接输出推断结果，只把仍需逐个检测的URL交给检测引擎"""
+    for url in urls:
+        try:
+            verdict = verdicts.get(HttpProbe.bucket_root(url))
+        except ValueError:
+            verdict = None
+        if verdict:
+            on_result(HttpProbe.inferred_result(url, *verdict))
+        else:
+            yield url
 
-    total_urls = len(urls)
-    if total_urls == 0:
-        print_status("url.txt文件中没有URL", Color.YELLOW)
-        return
 
-    print_status(f"发现 {total_urls} 个URL，开始检测...", Color.BLUE)
+def print_summary(stats, cache=None):
+    """输出结果统计，stats 为 Results.Aggregator"""
+    counts = stats.counts
+    Verdict = Results.Verdict
+    total_urls = stats.total
+    valid_count = counts[Verdict.VALID]
+    invalid_count = counts[Verdict.INVALID] + counts[Verdict.ERROR]
+    access_denied_count = counts[Verdict.DENIED]
+
+    print_status("\n" + "-" * 60, Color.CYAN)
+    print_status(f"{Color.BOLD}检测结果统计:{Color.RESET}", Color.PURPLE)
+    print_status(f"总检测URL数: {total_urls}", Color.BLUE)
+    print_status(f"有效URL数: {valid_count} {Color.GREEN}✅{Color.RESET}", Color.GREEN)
+    print_status(f"无效URL数: {invalid_count} {Color.RED}❌{Color.RESET}", Color.RED)
+    print_status(f"访问拒绝URL数: {access_denied_count} {Color.YELLOW}🚫{Color.RESET}", Color.YELLOW)
+    if stats.inferred:
+        print_status(f"按存储桶推断（未单独请求）的URL数: {stats.inferred}", Color.BLUE)
+    if cache:
+        print_status(f"缓存命中: {cache.hits}，条件请求验证未变化: {cache.revalidated}", Color.BLUE)
+    top_hosts = stats.top_hosts(Verdict.VALID)
+    if len(stats.hosts) > 1 and top_hosts:
+        print_status(f"{Color.BOLD}有效URL最多的host（共 {len(stats.hosts)} 个host）:{Color.RESET}", Color.PURPLE)
+        for host, host_counts in top_hosts:
+            print_status(f"  {host}  有效 {host_counts[Verdict.VALID]}，访问拒绝 {host_counts[Verdict.DENIED]}，"
+                         f"无效 {host_counts[Verdict.INVALID] + host_counts[Verdict.ERROR]}", Color.GREEN)
     print_status("-" * 60, Color.CYAN)
 
-    # 优化并发策略：根据URL数量动态调整线程数
-    max_workers = min(10, total_urls) if total_urls > 0 else 1
-    driver_pool = DriverPool(max_drivers=max_workers)  # 创建驱动池
 
-    results = []
-    processed = 0
+def print_metrics(metrics):
+    """输出所有host汇总的各阶段耗时"""
+    summary = metrics.summary()
+    if not summary:
+        return
+    print_status(f"{Color.BOLD}请求阶段耗时（所有host，毫秒）:{Color.RESET}", Color.PURPLE)
+    print_status(f"{'阶段':<16}{'次数':>8}{'平均':>10}{'p50':>10}{'p99':>10}", Color.BLUE)
+    for phase, row in summary.items():
+        print_status(f"{phase:<16}{row['count']:>8}{row['mean'] * 1000:>10.1f}"
+                     f"{row['p50'] * 1000:>10.1f}{row['p99'] * 1000:>10.1f}", Color.BLUE)
+    print_status("-" * 60, Color.CYAN)
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # 使用驱动池处理URL
-        futures = {executor.submit(process_url, url, driver_pool): url for url in urls}
 
-        for future in concurrent.futures.as_completed(futures):
-            processed += 1
-            percentage = (processed / total_urls) * 100
-            bar_length = 50
-            filled_length = int(bar_length * processed // total_urls)
-            bar = '█' * filled_length + '-' * (bar_length - filled_length)
-            print_status(f'\r检测进度: |{bar}| {percentage:.1f}% ({processed}/{total_urls})', Color.BLUE, end='')
+def parse_shard(value):
+    """解析 --shard i/N（0 <= i < N）"""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("格式应为 i/N，例如 0/4")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError("需要满足 0 <= i < N")
+    return index, count
 
-            try:
-                results.append(future.result())
-            except Exception as e:
-                print_status(f"\n处理URL时出错: {str(e)}", Color.RED)
 
-        print()
+def shard_of(url, count):
+    """按host哈希分片，同一host的URL总在同一分片（限速只在分片内生效）
 
-    # 关闭所有驱动
-    driver_pool.close_all()
+    无法解析的URL按整行哈希，仍只属于一个分片，由检测引擎记为错误。
+    """
+    try:
+        key = RateLimiter.host_of(url)
+    except ValueError:
+        key = url
+    return zlib.crc32(key.encode("utf-8")) % count
+
+
+def shard_journal_name(journal, index, count):
+    base, extension = os.path.splitext(journal)
+    return f"{base}.shard{index}of{count}{extension}"
+
+
+def merge_journals(args):
+    """合并多个分片日志：按URL去重，按输入文件顺序（没有输入文件时按URL排序）输出"""
+    paths = []
+    for pattern in args.merge:
+        paths.extend(sorted(glob.glob(pattern)) or [pattern])
+
+    # 合并时要在内存中保留所有URL的结果，使用紧凑的结果记录
+    merged = {}
+    for path in paths:
+        if not os.path.exists(path):
+            print_status(f"错误: 未找到日志文件 {path}", Color.RED)
+            return
+        count = 0
+        for result in RunJournal.iter_journal(path):
+            url = result.get("url")
+            if not url:
+                continue
+            count += 1
+            # 同一URL出现多次时，明确结论优先于请求失败，其余以后出现的为准
+            previous = merged.get(url)
+            if previous is None or not HttpProbe.is_error(result) or previous.verdict is Results.Verdict.ERROR:
+                merged[url] = Results.ResultRecord.from_dict(result)
+        print_status(f"读取日志 {path}: {count} 条结果", Color.BLUE)
+
+    ordered = []
+    if not UrlSource.is_stdin(args.input) and os.path.exists(args.input):
+        for url in UrlSource.iter_urls(args.input):
+            result = merged.pop(url, None)
+            if result:
+                ordered.append(result)
+    ordered.extend(merged[url] for url in sorted(merged))
+
+    report = ValidReport(args.format)
+    stats = Results.Aggregator()
+    with RunJournal.RunJournal(args.journal) as journal:
+        if journal.rotated:
+            print_status(f"已有的日志 {args.journal} 已改名保留为 {journal.rotated}", Color.YELLOW)
+        for record in ordered:
+            result = record.to_dict()
+            journal.append(result)
+            stats.add(result)
+            if is_valid(result):
+                report.add(result)
+    print_status(f"合并后共 {len(ordered)} 个URL，已写入日志 {args.journal}", Color.BLUE)
+
+    print_summary(stats)
+    report_file = report.close()
+    if report.error:
+        print_status(f"保存报告时出错: {str(report.error)}", Color.RED)
+    elif report_file is None:
+        print_status("没有有效的URL可写入报告", Color.YELLOW)
+    else:
+        print_status(f"\n有效URL信息已保存到: {report_file}", Color.GREEN)
+
+
+def run_sample_mode(urls, args, limiter, cache, retry=None, breaker=None, resolver=None):
+    """抽样模式：按存储桶+一级前缀分层抽样，结论在统计上确定后提前停止"""
+    strata = Sampling.collect_strata(urls, max_samples=args.max_samples, seed=args.seed)
+    print_status(f"抽样模式: 共 {len(strata)} 个分层（存储桶 + 一级前缀），"
+                 f"置信度 {args.confidence:.0%}，允许误差 ±{args.margin:.0%}", Color.BLUE)
+    print_status("-" * 60, Color.CYAN)
+
+    def on_round(round_no, active, sampled):
+        print_status(f"第 {round_no} 轮: {active} 个分层尚未确定，本轮抽样 {sampled} 个URL", Color.BLUE)
 
-    # 结果统计（保持不变）
-    valid_results = [r for r in results if r and r["valid"] and not r["access_denied"]]
-    invalid_results = [r for r in results if r and not r["valid"] and not r["access_denied"]]
-    access_denied_count = len([r for r in results if r and r["access_denied"]])
-    error_results = len([r for r in results if r is None])
+    z = Sampling.run_sampling(strata, confidence=args.confidence, margin=args.margin, batch=args.sample_batch,
+                              on_round=on_round, concurrency=args.concurrency or HttpProbe.DEFAULT_CONCURRENCY,
+                              timeout=args.timeout, user_agent=random.choice(get_user_agents()),
+                              limiter=limiter, cache=cache, method=args.probe_method,
+                              prefix_bytes=args.prefix_bytes, retry=retry, breaker=breaker, resolver=resolver)
 
-    valid_count = len(valid_results)
-    invalid_count = len(invalid_results) + error_results
+    rows = sorted((s.to_row(z) for s in strata), key=lambda row: -row["估计公开对象数"])
+    checked = sum(row["已抽样"] for row in rows)
+    exposed = [row for row in rows if row["公开"]]
 
     print_status("\n" + "-" * 60, Color.CYAN)
-    print_status(f"{Color.BOLD}检测结果统计:{Color.RESET}", Color.PURPLE)
-    print_status(f"总检测URL数: {total_urls}", Color.BLUE)
-    print_status(f"有效URL数: {valid_count} {Color.GREEN}✅{Color.RESET}", Color.GREEN)
-    print_status(f"无效URL数: {invalid_count} {Color.RED}❌{Color.RESET}", Color.RED)
-    print_status(f"访问拒绝URL数: {access_denied_count} {Color.YELLOW}🚫{Color.RESET}", Color.YELLOW)
+    print_status(f"{Color.BOLD}抽样结果:{Color.RESET}", Color.PURPLE)
+    print_status(f"总URL数: {sum(s.total for s in strata)}，实际检测: {checked}", Color.BLUE)
+    print_status(f"存在公开对象的分层: {len(exposed)} / {len(rows)}", Color.GREEN if exposed else Color.BLUE)
+    for row in exposed[:10]:
+        print_status(f"  {row['存储桶']}{row['前缀'].lstrip('/')}  公开比例 {row['公开比例估计']:.1%} "
+                     f"[{row['置信下限']:.1%}, {row['置信上限']:.1%}]  约 {row['估计公开对象数']} 个", Color.GREEN)
     print_status("-" * 60, Color.CYAN)
 
-    if valid_count == 0:
-        print_status("没有有效的URL可写入Excel", Color.YELLOW)
+    report_file = create_unique_filename("sample_result", args.format)
+    try:
+        writer = ReportWriter.open_report(report_file, Sampling.SAMPLE_COLUMNS)
+        for row in rows:
+            writer.write_row(row)
+        writer.close()
+        print_status(f"\n各前缀公开情况估计已保存到: {report_file}", Color.GREEN)
+    except Exception as e:
+        print_status(f"保存报告时出错: {str(e)}", Color.RED)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="OSS URL 批量检测工具")
+    parser.add_argument("-i", "--input", default="url.txt",
+                        help="URL列表文件，支持.gz压缩文件，'-' 表示从标准输入读取（默认: url.txt）")
+    parser.add_argument("--engine", choices=["http", "selenium"], default="http",
+                        help="检测引擎：http 为异步直连（默认），selenium 为无头Chrome")
+    parser.add_argument("-c", "--concurrency", type=int, default=None,
+                        help=f"并发数（http默认{HttpProbe.DEFAULT_CONCURRENCY}，selenium默认最多10）")
+    parser.add_argument("--timeout", type=float, default=HttpProbe.DEFAULT_TIMEOUT,
+                        help=f"http引擎单个请求超时秒数（默认{HttpProbe.DEFAULT_TIMEOUT}）")
+    parser.add_argument("--probe-method", choices=HttpProbe.PROBE_METHODS, default="range",
+                        help="http引擎的请求方式：range 只请求前 --prefix-bytes 字节（默认），head 只看状态码，"
+                             "get 为普通GET（同样只读取前缀）")
+    parser.add_argument("--prefix-bytes", type=int, default=HttpProbe.DEFAULT_PREFIX_BYTES,
+                        help=f"http引擎每个请求最多读取的字节数（默认{HttpProbe.DEFAULT_PREFIX_BYTES}）")
+    parser.add_argument("--rate", type=float, default=RateLimiter.DEFAULT_RATE,
+                        help=f"每个host的初始请求速率/秒，0表示不限速（默认{RateLimiter.DEFAULT_RATE:g}）")
+    parser.add_argument("--min-rate", type=float, default=RateLimiter.DEFAULT_MIN_RATE,
+                        help=f"自适应限速的最低速率/秒（默认{RateLimiter.DEFAULT_MIN_RATE:g}）")
+    parser.add_argument("--max-rate", type=float, default=RateLimiter.DEFAULT_MAX_RATE,
+                        help=f"自适应限速的最高速率/秒（默认{RateLimiter.DEFAULT_MAX_RATE:g}）")
+    parser.add_argument("--fixed-rate", action="store_true",
+                        help="关闭自适应，始终按 --rate 限速")
+    parser.add_argument("--retries", type=int, default=Retry.DEFAULT_RETRIES,
+                        help=f"超时、连接错误、5xx和限流的重试次数，0为不重试（默认{Retry.DEFAULT_RETRIES}）")
+    parser.add_argument("--retry-base", type=float, default=Retry.DEFAULT_BASE_DELAY,
+                        help=f"重试退避基数秒数，第n次重试前随机等待0到base*2^n秒（默认{Retry.DEFAULT_BASE_DELAY}）")
+    parser.add_argument("--retry-max", type=float, default=Retry.DEFAULT_MAX_DELAY,
+                        help=f"单次重试最长等待秒数（默认{Retry.DEFAULT_MAX_DELAY:g}）")
+    parser.add_argument("--breaker-threshold", type=int, default=Retry.DEFAULT_FAILURE_THRESHOLD,
+                        help=f"同一host连续失败多少次后熔断，熔断期间该host的URL直接记为错误，0为关闭"
+                             f"（默认{Retry.DEFAULT_FAILURE_THRESHOLD}）")
+    parser.add_argument("--breaker-reset", type=float, default=Retry.DEFAULT_RESET_TIMEOUT,
+                        help=f"熔断多少秒后放行一个探测请求（默认{Retry.DEFAULT_RESET_TIMEOUT:g}）")
+    parser.add_argument("--dns-workers", type=int, default=Resolver.DEFAULT_WORKERS,
+                        help=f"检测前对输入中的主机名去重并发预解析，域名不存在的存储桶不再发送请求；"
+                             f"此为同时进行的DNS查询数，0为不预解析（默认{Resolver.DEFAULT_WORKERS}）")
+    parser.add_argument("--dns-ttl", type=float, default=Resolver.DEFAULT_TTL,
+                        help=f"DNS结果缓存秒数（域名不存在的结果缓存{Resolver.DEFAULT_NEGATIVE_TTL}秒，"
+                             f"默认{Resolver.DEFAULT_TTL}）")
+    parser.add_argument("--checkout-timeout", type=float, default=60,
+                        help="selenium引擎等待空闲浏览器的超时秒数（默认60）")
+    parser.add_argument("--driver-max-pages", type=int, default=200,
+                        help="单个浏览器加载多少页面后回收重建，0为不限制（默认200）")
+    parser.add_argument("--driver-max-rss", type=int, default=1024,
+                        help="单个浏览器内存超过多少MB后回收重建，0为不限制，需要psutil（默认1024）")
+    parser.add_argument("--journal", default=RunJournal.DEFAULT_JOURNAL,
+                        help=f"检测日志文件，每个结果完成后立即追加写入（默认{RunJournal.DEFAULT_JOURNAL}）")
+    parser.add_argument("--resume", action="store_true",
+                        help="从日志续跑：跳过日志中已有明确结论的URL（请求失败的重新检测），并用日志中的结果重建报告")
+    parser.add_argument("--bucket-prepass", action="store_true",
+                        help="先按存储桶探测一次，NoSuchBucket/禁止列举(AccessDenied)的桶下所有URL直接推断结果"
+                             "（注意：私有桶中单独设置了公共读的对象会被漏检）")
+    parser.add_argument("--priority", action="store_true",
+                        help="优先级调度：按扩展名和路径特征打分（.sql/.env/备份/密钥/压缩包等），高分URL最先检测")
+    parser.add_argument("--priority-rules", default=None,
+                        help="优先级规则文件（JSON：extensions / patterns / threshold），与默认规则合并，指定后启用优先级调度")
+    parser.add_argument("--priority-only", action="store_true",
+                        help=f"只检测高优先级（评分达到阈值，默认{Priority.DEFAULT_THRESHOLD}）的URL，检测完即结束")
+    parser.add_argument("--sample", action="store_true",
+                        help="抽样模式：按存储桶+一级前缀分层抽样，估计各前缀的公开比例及置信区间")
+    parser.add_argument("--confidence", type=float, default=Sampling.DEFAULT_CONFIDENCE,
+                        help=f"抽样模式的置信度（默认{Sampling.DEFAULT_CONFIDENCE}）")
+    parser.add_argument("--margin", type=float, default=Sampling.DEFAULT_MARGIN,
+                        help=f"抽样模式允许的误差（置信区间半宽，默认{Sampling.DEFAULT_MARGIN}）")
+    parser.add_argument("--sample-batch", type=int, default=Sampling.DEFAULT_BATCH,
+                        help=f"每轮每个分层的抽样数（默认{Sampling.DEFAULT_BATCH}）")
+    parser.add_argument("--max-samples", type=int, default=Sampling.DEFAULT_MAX_SAMPLES,
+                        help=f"每个分层最多抽样数（默认{Sampling.DEFAULT_MAX_SAMPLES}）")
+    parser.add_argument("--seed", type=int, default=None, help="抽样随机种子（用于复现）")
+    parser.add_argument("--shard", type=parse_shard, default=None, metavar="i/N",
+                        help="只检测第i个分片（按host哈希分成N片，0 <= i < N），日志默认写入对应的分片日志")
+    parser.add_argument("--merge", nargs="+", default=None, metavar="JOURNAL",
+                        help="合并多个分片日志（支持通配符），去重后按输入文件顺序生成报告并写入 --journal")
+    parser.add_argument("--format", choices=ReportWriter.REPORT_FORMATS, default="xlsx",
+                        help="有效URL报告格式（默认xlsx，parquet需要pyarrow）")
+    parser.add_argument("--output", choices=EventSink.OUTPUT_MODES, default="text",
+                        help="控制台输出：text 逐条彩色输出（默认），jsonl 每个结果一行JSON输出到标准输出"
+                             "（状态信息和进度输出到标准错误），quiet 只显示进度和统计")
+    parser.add_argument("--cache", default=None,
+                        help="结果缓存文件（SQLite），指定后启用跨运行的结果缓存")
+    parser.add_argument("--cache-ttl", type=float, default=ResultCache.DEFAULT_TTL / 3600,
+                        help=f"缓存有效期（小时），过期后用条件请求重新验证（默认{ResultCache.DEFAULT_TTL // 3600}）")
+    parser.add_argument("--cache-size", type=int, default=ResultCache.DEFAULT_MAX_ENTRIES,
+                        help=f"缓存最多保留的URL数，超出按最近访问时间淘汰（默认{ResultCache.DEFAULT_MAX_ENTRIES}）")
+    parser.add_argument("--metrics-out", default=None,
+                        help="运行结束后导出各host的请求阶段耗时直方图（.json为JSON摘要，其他为Prometheus文本格式）")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="运行期间在本地端口提供 /metrics（Prometheus）和 /metrics.json")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    start_output(args.output)
+
+    if args.merge:
+        merge_journals(args)
         return
 
-    # 准备写入Excel的数据
-    for i, result in enumerate(valid_results, 1):
-        result["序号"] = i
+    if args.shard and args.journal == RunJournal.DEFAULT_JOURNAL:
+        args.journal = shard_journal_name(args.journal, *args.shard)
 
-    df = pd.DataFrame(valid_results)
-    df = df[["序号", "url", "Code", "Message", "Resource", "RequestId"]]
+    print_status("\n" + "=" * 60, Color.CYAN)
+    print_status(f"{Color.BOLD}                      URL批量检测工具                      {Color.RESET}", Color.CYAN)
+    print_status(f"{Color.BOLD}                     (OSS URL Checker)                    {Color.RESET}", Color.CYAN)
+    print_status("=" * 60 + "\n", Color.CYAN)
 
-    excel_file = create_unique_filename("result", "xlsx")
+    # URL列表全程流式读取，只预先计数用于显示进度
+    source = args.input
+    if not UrlSource.is_stdin(source) and not os.path.exists(source):
+        print_status(f"错误: 未找到{source}文件", Color.RED)
+        return
 
-    try:
-        df.to_excel(excel_file, index=False)
-        print_status(f"\n有效URL信息已保存到: {excel_file}", Color.GREEN)
+    keep = None
+    if args.shard:
+        index, count = args.shard
+        keep = lambda url: shard_of(url, count) == index
+
+    def read_urls():
+        urls = UrlSource.iter_urls(source)
+        return urls if keep is None else (url for url in urls if keep(url))
 
-        if format_excel(excel_file):
-            print_status("Excel文件已美化完成", Color.GREEN)
+    try:
+        total_urls = UrlSource.count_urls(source, keep)
     except Exception as e:
-        print_status(f"保存Excel时出错: {str(e)}", Color.RED)
+        print_status(f"读取{source}时出错: {str(e)}", Color.RED)
+        return
+
+    if args.shard:
+        print_status(f"分片 {index}/{count}: 本分片包含 {total_urls if total_urls is not None else '未知数量'} 个URL，"
+                     f"日志: {args.journal}", Color.BLUE)
+
+    if total_urls == 0:
+        print_status(f"{source}文件中没有URL", Color.YELLOW)
+        return
+
+    if total_urls is None:
+        print_status(f"从标准输入读取URL，开始检测（{args.engine}引擎）...", Color.BLUE)
+    else:
+        print_status(f"发现 {total_urls} 个URL，开始检测（{args.engine}引擎）...", Color.BLUE)
+
+    limiter = None
+    if args.rate > 0:
+        limiter = RateLimiter.HostRateLimiter(rate=args.rate, min_rate=args.min_rate,
+                                              max_rate=args.max_rate, adaptive=not args.fixed_rate)
+
+    cache = None
+    if args.cache:
+        cache = ResultCache.ResultCache(args.cache, ttl=args.cache_ttl * 3600, max_entries=args.cache_size)
+
+    retry = Retry.RetryPolicy(args.retries, args.retry_base, args.retry_max)
+    breaker = None
+    if args.breaker_threshold > 0:
+        breaker = Retry.CircuitBreaker(args.breaker_threshold, args.breaker_reset)
+
+    # 所有引擎共用的DNS缓存
+    resolver = Resolver.HostResolver(ttl=args.dns_ttl, negative_ttl=min(args.dns_ttl, Resolver.DEFAULT_NEGATIVE_TTL))
+
+    if args.sample:
+        try:
+            run_sample_mode(read_urls(), args, limiter, cache, retry, breaker, resolver)
+        finally:
+            if cache:
+                cache.close()
+        return
+
+    metrics = None
+    if args.metrics_out or args.metrics_port is not None:
+        metrics = Metrics.RequestMetrics()
+    if args.metrics_port is not None:
+        port = metrics.serve(args.metrics_port)
+        print_status(f"指标地址: http://127.0.0.1:{port}/metrics", Color.BLUE)
+
+    # 有效结果随检测进度逐行写入报告，结果写入后即释放，只保留各类计数
+    report = ValidReport(args.format)
+    stats = Results.Aggregator()
+
+    # 续跑：日志中已有明确结论的URL直接复用结果，并先写入报告；
+    # 超时、连接错误、熔断等请求失败的结果不算完成，重新检测
+    done = set()
+    if args.resume and not os.path.exists(args.journal):
+        print_status(f"日志 {args.journal} 不存在，从头开始检测", Color.YELLOW)
+    elif args.resume:
+        failed = set()
+        for result in RunJournal.iter_journal(args.journal):
+            url = result.get("url")
+            if not url or url in done:
+                continue
+            if HttpProbe.is_error(result):
+                failed.add(url)
+                continue
+            done.add(url)
+            stats.add(result)
+            if is_valid(result):
+                report.add(result)
+        failed -= done
+        print_status(f"已从日志 {args.journal} 恢复 {len(done)} 个结果，{len(failed)} 个请求失败的URL将重新检测",
+                     Color.BLUE)
+
+    print_status("-" * 60, Color.CYAN)
+
+    processed = len(done)
+    journal = RunJournal.RunJournal(args.journal, resume=args.resume)
+    if journal.rotated:
+        print_status(f"已有的日志 {args.journal} 已改名保留为 {journal.rotated}（续跑请使用 --resume）", Color.YELLOW)
+
+    def on_result(result):
+        nonlocal processed
+        processed += 1
+        stats.add(result)
+        print_result(result)
+        if result:
+            journal.append(result)
+            if is_valid(result):
+                report.add(result)
+        print_progress(processed, total_urls)
+
+    def pending_urls():
+        urls = read_urls()
+        return (url for url in urls if url not in done) if done else urls
+
+    # 已知总数时，并发数不超过剩余URL数
+    remaining = max(1, total_urls - len(done)) if total_urls is not None else None
+    try:
+        if args.dns_workers > 0:
+            if UrlSource.is_stdin(source):
+                # 标准输入无法读两遍，检测时再按需解析（结果同样缓存）
+                print_status("从标准输入读取时不进行DNS预解析，检测时按需解析", Color.YELLOW)
+            else:
+                dns_prefetch(pending_urls(), resolver, args.dns_workers)
+
+        urls = pending_urls()
+        if args.bucket_prepass:
+            if UrlSource.is_stdin(source):
+                # 预检需要先遍历一遍URL收集存储桶，标准输入无法读两遍
+                print_status("从标准输入读取时不支持存储桶预检，已跳过", Color.YELLOW)
+            else:
+                verdicts = bucket_prepass(urls, args.concurrency or HttpProbe.DEFAULT_CONCURRENCY,
+                                          args.timeout, limiter, resolver)
+                urls = skip_inferred(pending_urls(), verdicts, on_result)
+
+        if args.priority or args.priority_rules or args.priority_only:
+            scorer = Priority.Scorer.from_file(args.priority_rules) if args.priority_rules else Priority.Scorer()
+            scheduler = Priority.PriorityScheduler(urls, scorer, args.priority_only)
+            skipped = "，其余URL不检测" if args.priority_only else f"，其余 {scheduler.low_count} 个按原顺序检测"
+            print_status(f"优先级调度: {scheduler.high_count} 个高优先级URL（评分 >= {scorer.threshold}）最先检测"
+                         f"{skipped}", Color.BLUE)
+            if args.priority_only:
+                total_urls = processed + scheduler.high_count
+            urls = iter(scheduler)
+
+        # 先取出第一个URL，全部已完成时不启动检测引擎
+        first = next(urls, None)
+        urls = itertools.chain([first], urls)
+        if first is None:
+            pass
+        elif args.engine == "selenium":
+            # 优化并发策略：根据URL数量动态调整线程数
+            max_workers = min(args.concurrency or 10, remaining or 10)
+            run_selenium(urls, max_workers, limiter, cache, on_result, metrics, retry, breaker, resolver,
+                         checkout_timeout=args.checkout_timeout,
+                         max_pages=args.driver_max_pages,
+                         max_rss_mb=args.driver_max_rss)
+        else:
+            concurrency = args.concurrency or HttpProbe.DEFAULT_CONCURRENCY
+            if remaining:
+                concurrency = min(concurrency, remaining)
+            run_http(urls, concurrency, args.timeout, limiter, cache, on_result, metrics,
+                     args.probe_method, args.prefix_bytes, retry, breaker, resolver)
+    except KeyboardInterrupt:
+        print_status(f"\n检测已中断，已完成的 {processed} 个结果保存在 {args.journal}，"
+                     f"可使用 --resume 继续", Color.YELLOW)
+    finally:
+        journal.close()
+        if cache:
+            cache.close()
+
+    finish_progress()
+
+    print_summary(stats, cache)
+    if resolver.lookups:
+        print_status(f"DNS缓存命中: {resolver.hits}，实际查询: {resolver.lookups}", Color.BLUE)
+    if breaker and breaker.open_count():
+        print_status(f"运行结束时仍处于熔断状态的host数: {breaker.open_count()}"
+                     f"（熔断期间的URL记为错误: {Retry.CIRCUIT_OPEN_MESSAGE}）", Color.YELLOW)
+
+    if metrics:
+        print_metrics(metrics)
+        if args.metrics_out:
+            try:
+                metrics.write(args.metrics_out)
+                print_status(f"请求阶段耗时指标已导出到: {args.metrics_out}", Color.GREEN)
+            except OSError as e:
+                print_status(f"导出指标时出错: {str(e)}", Color.RED)
+        metrics.close()
+
+    report_file = report.close()
+    if report.error:
+        print_status(f"保存报告时出错: {str(report.error)}", Color.RED)
+    elif report_file is None:
+        print_status("没有有效的URL可写入报告", Color.YELLOW)
+    else:
+        print_status(f"\n有效URL信息已保存到: {report_file}", Color.GREEN)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        stop_output()
\ No newline at end of file
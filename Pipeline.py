@@ -0,0 +1,314 @@
+import argparse
+import asyncio
+import concurrent.futures
+import itertools
+import math
+import random
+import threading
+
+import EventSink
+import HttpProbe
+import KeyExtract
+import Priority
+import RateLimiter
+import ReportWriter
+import Resolver
+import Results
+import Retry
+import RunJournal
+import Snapshot
+from OSSURLChecker import (Color, print_status, print_result, print_progress, print_summary, finish_progress,
+                           start_output, stop_output, get_user_agents, is_valid, ValidReport)
+
+# 检测被中断、事件循环已经关闭时放入队列会抛出的异常
+LOOP_CLOSED_ERRORS = (RuntimeError, concurrent.futures.CancelledError)
+
+# 列举与检测之间的队列长度：检测跟不上时列举线程在此等待，内存占用有上限
+DEFAULT_QUEUE_SIZE = 10000
+# 优先级队列中的结束标记，排在所有URL之后
+PRIORITY_END = (math.inf, math.inf, None)
+# 流水线的检测日志，与OSSURLChecker.py的日志分开，互不覆盖
+DEFAULT_JOURNAL = "pipeline_journal.jsonl"
+
+
+class QueueSource:
+    """从asyncio队列中取URL的异步迭代器，多个协程可以同时迭代，取到None时结束
+
+    优先级队列中的元素为 (-评分, 序号, URL)，结束标记为PRIORITY_END。
+    """
+
+    def __init__(self, queue):
+        self.queue = queue
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        item = await self.queue.get()
+        url = item[2] if isinstance(item, tuple) else item
+        if url is None:
+            # 放回结束标记，让其他协程也能结束
+            self.queue.put_nowait(item)
+            raise StopAsyncIteration
+        return url
+
+
+class ListingProducer(threading.Thread):
+    """后台线程：分页列举存储桶，把对象链接逐个放入检测队列
+
+    可选地同时写出列举结果表格（与KeyExtract相同的列）和Host列表（与ExtractHost的url.txt相同）。
+    指定快照时只把新增和变化的对象放入检测队列，变更类型记入changes（URL -> 变更类型）；
+    快照在检测完成后由调用方对completed中的存储桶调用finish()保存。
+    指定scorer时按评分（包括列举得到的Size/LastModified）放入优先级队列，队列中评分高的URL先检测；
+    high_only为True时评分未达到阈值的对象不检测（计入skipped）。
+    """
+
+    def __init__(self, bucket_urls, queue, loop, listing_out=None, hosts_out=None, fanout_depth=0,
+                 snapshot=None, changes=None, scorer=None, high_only=False):
+        super().__init__(daemon=True)
+        self.bucket_urls = bucket_urls
+        self.queue = queue
+        self.loop = loop
+        self.listing_out = listing_out
+        self.hosts_out = hosts_out
+        self.fanout_depth = fanout_depth
+        self.snapshot = snapshot
+        self.changes = changes if changes is not None else {}
+        self.change_counts = dict.fromkeys(Snapshot.CHANGE_LABELS, 0)
+        self.completed = []
+        self.scorer = scorer
+        self.high_only = high_only
+        self.skipped = 0
+        self._order = itertools.count()
+        self.listed = 0
+        self.errors = []
+        self.finished = asyncio.Event()
+
+    def _put(self, url):
+        asyncio.run_coroutine_threadsafe(self.queue.put(url), self.loop).result()
+
+    def _listing(self, bucket_url):
+        """逐条产出 (变更类型, 记录)，不使用快照时变更类型为None"""
+        records = KeyExtract.list_bucket(bucket_url, fanout_depth=self.fanout_depth)
+        if self.snapshot:
+            return Snapshot.diff_listing(self.snapshot, bucket_url, records)
+        return ((None, record) for record in records)
+
+    def run(self):
+        writer = None
+        hosts_file = None
+        try:
+            if self.listing_out:
+                columns = KeyExtract.RESULT_COLUMNS + ([KeyExtract.DIFF_COLUMN] if self.snapshot else [])
+                writer = ReportWriter.open_report(self.listing_out, columns, center_columns=('序号',))
+            if self.hosts_out:
+                hosts_file = open(self.hosts_out, "w", encoding="utf-8")
+
+            for bucket_url in self.bucket_urls:
+                base_url = KeyExtract.bucket_base_url(bucket_url)
+                try:
+                    for change, record in self._listing(bucket_url):
+                        host = KeyExtract.object_url(base_url, record['Key'])
+                        self.listed += 1
+                        if writer:
+                            item = dict(record)
+                            item['序号'] = self.listed
+                            item['Host'] = host
+                            if change:
+                                item[KeyExtract.DIFF_COLUMN] = change
+                            writer.write_row(item)
+                        if change:
+                            self.change_counts[change] += 1
+                        if change == Snapshot.REMOVED:
+                            # 已删除的对象不再检测
+                            continue
+                        if hosts_file:
+                            hosts_file.write(f"{host}\n")
+                        item = host
+                        if self.scorer:
+                            score = self.scorer.score(host, record.get('Size'), record.get('LastModified'))
+                            if self.high_only and score < self.scorer.threshold:
+                                self.skipped += 1
+                                continue
+                            item = (-score, next(self._order), host)
+                        if change:
+                            self.changes[host] = change
+                        self._put(item)
+                    if self.snapshot:
+                        self.completed.append(bucket_url)
+                except LOOP_CLOSED_ERRORS:
+                    # 事件循环已经关闭（检测被中断）
+                    return
+                except Exception as e:
+                    self.errors.append((bucket_url, e))
+        except Exception as e:
+            # 列举结果或Host列表文件无法创建/写入
+            self.errors.append(("输出文件", e))
+        finally:
+            if writer:
+                writer.close()
+            if hosts_file:
+                hosts_file.close()
+            try:
+                self._put(PRIORITY_END if self.scorer else None)
+                self.loop.call_soon_threadsafe(self.finished.set)
+            except LOOP_CLOSED_ERRORS:
+                pass
+
+
+async def run_pipeline(bucket_urls, on_result, queue_size=DEFAULT_QUEUE_SIZE, listing_out=None,
+                       hosts_out=None, fanout_depth=0, snapshot=None, changes=None, scorer=None, high_only=False,
+                       **probe_options):
+    """列举与检测同时进行：列举线程产出的对象链接直接进入异步检测引擎"""
+    queue = asyncio.PriorityQueue(maxsize=queue_size) if scorer else asyncio.Queue(maxsize=queue_size)
+    producer = ListingProducer(bucket_urls, queue, asyncio.get_running_loop(), listing_out, hosts_out,
+                               fanout_depth, snapshot, changes, scorer, high_only)
+    producer.start()
+    await HttpProbe.probe_urls(QueueSource(queue), on_result, **probe_options)
+    await producer.finished.wait()
+    return producer
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="列举存储桶并检测对象URL（KeyExtract → ExtractHost → OSSURLChecker 一步完成）")
+    parser.add_argument("urls", nargs="*", help="要列举的存储桶URL，可以有多个（不指定时交互输入）")
+    parser.add_argument("--listing-out", default=None,
+                        help="同时保存列举结果表格（扩展名决定格式：xlsx/csv/parquet），默认不保存")
+    parser.add_argument("--hosts-out", default=None, help="同时保存对象链接列表（如url.txt），默认不保存")
+    parser.add_argument("--fanout-depth", type=int, default=0,
+                        help="前缀分发：先发现几层公共前缀再并行列举（默认0，按页串行列举）")
+    parser.add_argument("--snapshot", default=None,
+                        help="差异模式：列举快照文件（SQLite），只检测与上次快照相比新增和变化的对象，"
+                             "检测完成后更新快照")
+    parser.add_argument("--priority", action="store_true",
+                        help="优先级调度：按扩展名、路径特征、对象大小和修改时间打分，队列中评分高的URL先检测")
+    parser.add_argument("--priority-rules", default=None,
+                        help="优先级规则文件（JSON：extensions / patterns / threshold），指定后启用优先级调度")
+    parser.add_argument("--priority-only", action="store_true",
+                        help=f"只检测高优先级（评分达到阈值，默认{Priority.DEFAULT_THRESHOLD}）的对象")
+    parser.add_argument("-c", "--concurrency", type=int, default=HttpProbe.DEFAULT_CONCURRENCY,
+                        help=f"检测并发数（默认{HttpProbe.DEFAULT_CONCURRENCY}）")
+    parser.add_argument("--timeout", type=float, default=HttpProbe.DEFAULT_TIMEOUT,
+                        help=f"单个请求超时秒数（默认{HttpProbe.DEFAULT_TIMEOUT}）")
+    parser.add_argument("--probe-method", choices=HttpProbe.PROBE_METHODS, default="range",
+                        help="请求方式：range 只请求前几KB（默认），head 只看状态码，get 为普通GET")
+    parser.add_argument("--rate", type=float, default=RateLimiter.DEFAULT_RATE,
+                        help=f"每个host的初始请求速率/秒，0表示不限速（默认{RateLimiter.DEFAULT_RATE:g}）")
+    parser.add_argument("--retries", type=int, default=Retry.DEFAULT_RETRIES,
+                        help=f"列举和检测请求失败（超时、连接错误、5xx、限流）时的重试次数（默认{Retry.DEFAULT_RETRIES}）")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help=f"列举与检测之间的队列长度（默认{DEFAULT_QUEUE_SIZE}）")
+    parser.add_argument("--journal", default=DEFAULT_JOURNAL,
+                        help=f"检测日志文件（默认{DEFAULT_JOURNAL}，已有的日志会改名保留）")
+    parser.add_argument("--format", choices=ReportWriter.REPORT_FORMATS, default="xlsx",
+                        help="有效URL报告格式（默认xlsx）")
+    parser.add_argument("--output", choices=EventSink.OUTPUT_MODES, default="text",
+                        help="控制台输出：text 逐条彩色输出（默认），jsonl 每个结果一行JSON输出到标准输出"
+                             "（状态信息和进度输出到标准错误），quiet 只显示进度和统计")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    print_status("\n" + "=" * 60, Color.CYAN)
+    print_status(f"{Color.BOLD}                  存储桶列举 + URL检测流水线                  {Color.RESET}", Color.CYAN)
+    print_status("=" * 60 + "\n", Color.CYAN)
+
+    bucket_urls = args.urls
+    if not bucket_urls:
+        url = input(f"{Color.BOLD}请输入要访问的URL: {Color.RESET}").strip()
+        bucket_urls = [url] if url else []
+    if not bucket_urls:
+        print_status("没有输入存储桶URL", Color.YELLOW)
+        return
+
+    limiter = RateLimiter.HostRateLimiter(rate=args.rate) if args.rate > 0 else None
+    retry = Retry.RetryPolicy(args.retries)
+    KeyExtract.LISTING_RETRY.retries = retry.retries
+    # 列举（requests）和检测（aiohttp）共用同一份DNS缓存
+    resolver = KeyExtract.LISTING_RESOLVER
+    Resolver.install(resolver)
+    scorer = None
+    if args.priority or args.priority_rules or args.priority_only:
+        scorer = Priority.Scorer.from_file(args.priority_rules) if args.priority_rules else Priority.Scorer()
+    snapshot = Snapshot.SnapshotStore(args.snapshot) if args.snapshot else None
+    changes = {}
+    report = ValidReport(args.format, diff=snapshot is not None)
+    stats = Results.Aggregator()
+    processed = 0
+    journal = RunJournal.RunJournal(args.journal)
+    if journal.rotated:
+        print_status(f"已有的日志 {args.journal} 已改名保留为 {journal.rotated}", Color.YELLOW)
+
+    def on_result(result):
+        nonlocal processed
+        processed += 1
+        change = changes.pop(result["url"], None)
+        if change:
+            result["change"] = change
+        stats.add(result)
+        print_result(result)
+        journal.append(result)
+        if is_valid(result):
+            report.add(result)
+        print_progress(processed, None)
+
+    # 交互输入完成后再启动单线程输出
+    start_output(args.output)
+    print_status(f"开始列举 {len(bucket_urls)} 个存储桶，列举的同时进行检测...", Color.BLUE)
+    print_status("-" * 60, Color.CYAN)
+
+    producer = None
+    try:
+        producer = asyncio.run(run_pipeline(
+            bucket_urls, on_result, queue_size=args.queue_size, listing_out=args.listing_out,
+            hosts_out=args.hosts_out, fanout_depth=args.fanout_depth, snapshot=snapshot, changes=changes,
+            scorer=scorer, high_only=args.priority_only, concurrency=args.concurrency, timeout=args.timeout,
+            user_agent=random.choice(get_user_agents()), limiter=limiter, method=args.probe_method,
+            retry=retry, breaker=Retry.CircuitBreaker(), resolver=resolver))
+        if snapshot and not producer.skipped:
+            # 变更的对象全部检测完成后才更新快照，中断时（或只检测了高优先级对象时）下次运行仍会检测这些对象
+            for bucket_url in producer.completed:
+                snapshot.finish(bucket_url)
+    except KeyboardInterrupt:
+        print_status(f"\n检测已中断，已完成的 {processed} 个结果保存在 {args.journal}", Color.YELLOW)
+    finally:
+        journal.close()
+        if snapshot:
+            snapshot.close()
+
+    finish_progress()
+    if producer:
+        for bucket_url, error in producer.errors:
+            print_status(f"列举 {bucket_url} 时出错: {str(error)}", Color.RED)
+        if snapshot:
+            counts = producer.change_counts
+            print_status(f"与上次快照相比：新增 {counts[Snapshot.ADDED]}，变化 {counts[Snapshot.CHANGED]}，"
+                         f"删除 {counts[Snapshot.REMOVED]}（只检测新增和变化的对象）", Color.BLUE)
+        else:
+            print_status(f"共列举 {producer.listed} 个对象", Color.BLUE)
+        if producer.skipped:
+            print_status(f"未达到优先级阈值、未检测的对象: {producer.skipped}"
+                         f"{'（快照未更新）' if snapshot else ''}", Color.YELLOW)
+        if args.listing_out:
+            print_status(f"列举结果已保存到: {args.listing_out}", Color.GREEN)
+        if args.hosts_out:
+            print_status(f"对象链接已保存到: {args.hosts_out}", Color.GREEN)
+
+    print_summary(stats)
+
+    report_file = report.close()
+    if report.error:
+        print_status(f"保存报告时出错: {str(report.error)}", Color.RED)
+    elif report_file is None:
+        print_status("没有有效的URL可写入报告", Color.YELLOW)
+    else:
+        print_status(f"\n有效URL信息已保存到: {report_file}", Color.GREEN)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        stop_output()
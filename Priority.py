@@ -0,0 +1,147 @@
+import heapq
+import itertools
+import json
+import math
+import posixpath
+import re
+import tempfile
+from datetime import datetime, timezone
+from urllib.parse import unquote, urlsplit
+
+# 默认评分规则：扩展名、路径特征（正则，不区分大小写）各取最高的一项相加
+DEFAULT_EXTENSIONS = {
+    # 数据库、密钥、凭据
+    **dict.fromkeys((".sql", ".db", ".sqlite", ".sqlite3", ".mdb", ".dump", ".bak", ".env", ".pem", ".key",
+                     ".p12", ".pfx", ".jks", ".keystore", ".kdbx", ".ppk", ".ovpn", ".htpasswd"), 100),
+    # 压缩包和备份归档
+    **dict.fromkeys((".zip", ".tar", ".gz", ".tgz", ".7z", ".rar", ".bz2", ".xz", ".war", ".jar"), 60),
+    # 配置、日志和办公文档
+    **dict.fromkeys((".conf", ".config", ".cfg", ".ini", ".yml", ".yaml", ".properties", ".json", ".xml",
+                     ".log", ".csv", ".xls", ".xlsx", ".doc", ".docx", ".pdf", ".txt"), 30),
+}
+DEFAULT_PATTERNS = {
+    r"(^|/)\.(git|svn|aws|ssh|docker)/|id_[rd]sa|credential|secret|passw(or)?d|private|token|accesskey": 80,
+    r"backup|bak|dump|snapshot|(^|/)db[_-]?": 50,
+    r"config|admin|internal|export|employee|salary|invoice|contract": 20,
+}
+# 大对象加分：按大小的数量级，10MB起每大一个数量级加10分，最多加30分
+SIZE_BONUS_START = 10 * 1024 * 1024
+SIZE_BONUS_STEP = 10
+SIZE_BONUS_MAX = 30
+# 最近修改的对象加分
+RECENT_DAYS = 30
+RECENT_BONUS = 10
+
+# 评分达到此值的URL属于高优先级，最先检测
+DEFAULT_THRESHOLD = 50
+
+
+def parse_size(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_time(value):
+    """解析列举结果中的LastModified（ISO 8601，如 2024-01-01T00:00:00.000Z）"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class Scorer:
+    """按扩展名、路径特征以及（已知时）对象大小和修改时间给URL打分，分数越高越先检测
+
+    规则可以通过JSON文件覆盖或补充（见from_file）；也可以传入任何带
+    score(url, size=None, last_modified=None) 方法和 threshold 属性的对象替代本类。
+    """
+
+    def __init__(self, extensions=None, patterns=None, threshold=DEFAULT_THRESHOLD):
+        self.extensions = {ext.lower(): score for ext, score in (extensions or DEFAULT_EXTENSIONS).items()}
+        self.patterns = [(re.compile(pattern, re.IGNORECASE), score)
+                         for pattern, score in (patterns or DEFAULT_PATTERNS).items()]
+        self.threshold = threshold
+        self._now = datetime.now(timezone.utc)
+
+    @classmethod
+    def from_file(cls, path):
+        """读取规则文件：{"extensions": {".sql": 100}, "patterns": {"正则": 分数}, "threshold": 50}
+
+        文件中的扩展名和路径规则与默认规则合并（同名覆盖，分数为0即取消该规则）。
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            rules = json.load(f)
+        extensions = dict(DEFAULT_EXTENSIONS, **rules.get("extensions", {}))
+        patterns = dict(DEFAULT_PATTERNS, **rules.get("patterns", {}))
+        return cls({ext: score for ext, score in extensions.items() if score},
+                   {pattern: score for pattern, score in patterns.items() if score},
+                   rules.get("threshold", DEFAULT_THRESHOLD))
+
+    def score(self, url, size=None, last_modified=None):
+        try:
+            path = unquote(urlsplit(url).path).lower()
+        except ValueError:
+            # 无法解析的URL（如 http://[bad）记0分，归入低优先级，由检测引擎记为错误
+            return 0
+        name = posixpath.basename(path)
+        score = max((value for ext, value in self.extensions.items() if name.endswith(ext)), default=0)
+        score += max((value for pattern, value in self.patterns if pattern.search(path)), default=0)
+
+        size = parse_size(size)
+        if size and size >= SIZE_BONUS_START:
+            steps = int(math.log10(size / SIZE_BONUS_START)) + 1
+            score += min(SIZE_BONUS_MAX, steps * SIZE_BONUS_STEP)
+        modified = parse_time(last_modified)
+        if modified and (self._now - modified).days <= RECENT_DAYS:
+            score += RECENT_BONUS
+        return score
+
+
+class PriorityScheduler:
+    """先读完整个URL流并打分：高优先级URL放入堆中按分数从高到低产出，其余URL暂存到临时文件，
+    之后按原顺序产出
+
+    高优先级的URL通常只占很小一部分，内存占用只与它们的数量有关。high_only为True时
+    高优先级的URL检测完就结束。
+    """
+
+    def __init__(self, urls, scorer, high_only=False):
+        self.scorer = scorer
+        self.high_only = high_only
+        self.high = []
+        self.low_count = 0
+        self._spill = None
+        order = itertools.count()
+        for url in urls:
+            score = scorer.score(url)
+            if score >= scorer.threshold:
+                heapq.heappush(self.high, (-score, next(order), url))
+            elif not high_only:
+                if self._spill is None:
+                    self._spill = tempfile.TemporaryFile("w+", encoding="utf-8")
+                self._spill.write(url + "\n")
+                self.low_count += 1
+            else:
+                self.low_count += 1
+        self.high_count = len(self.high)
+
+    def __iter__(self):
+        try:
+            while self.high:
+                yield heapq.heappop(self.high)[2]
+            if self._spill is not None:
+                self._spill.seek(0)
+                for line in self._spill:
+                    yield line.rstrip("\n")
+        finally:
+            self.close()
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
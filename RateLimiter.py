@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+from urllib.parse import urlsplit
+
+# 每个host的初始/最小/最大速率（请求数/秒）
+DEFAULT_RATE = 50.0
+DEFAULT_MIN_RATE = 1.0
+DEFAULT_MAX_RATE = 1000.0
+# 第一次被限流之后，响应正常时每秒提升的速率（请求数/秒）
+DEFAULT_INCREASE = 5.0
+
+# 排队的请求最多等待这么久就重新检查令牌桶，速率变化能及时作用到已经在排队的请求
+RECHECK_INTERVAL = 0.1
+
+# 表示被限流的状态码和OSS/S3错误码
+THROTTLE_STATUS = {429, 503}
+THROTTLE_CODES = {"SlowDown", "TooManyRequests", "RequestLimitExceeded", "Throttling"}
+
+
+def host_of(url):
+    """取URL的host（含端口）作为限速的键"""
+    return urlsplit(url).netloc.lower()
+
+
+class TokenBucket:
+    """令牌桶：允许最多1秒的突发，令牌不足时不预支，排队的请求按当前速率重新检查"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = max(1.0, rate)
+        self.updated = time.monotonic()
+        # 慢启动阶段：还没有被限流过，速率按倍数增长
+        self.slow_start = True
+        # 正在排队等待令牌的请求数，用于估算等待时间
+        self.waiting = 0
+
+    def take(self):
+        """有令牌时取走一个并返回0，否则返回按排队数和当前速率估算的等待秒数"""
+        now = time.monotonic()
+        capacity = max(1.0, self.rate)
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (self.waiting + 1 - self.tokens) / self.rate
+
+
+class HostRateLimiter:
+    """按host独立限速的自适应令牌桶（慢启动 + AIMD）
+
+    每个host从慢启动开始，每个正常响应使速率加1，速率大约每秒翻倍，很快达到max_rate；
+    第一次遇到 429/503/SlowDown 后速率乘以 decrease，之后响应正常时每秒约提升 increase 次/秒。
+    线程安全，Selenium线程池和异步引擎都可以共用。
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, min_rate=DEFAULT_MIN_RATE, max_rate=DEFAULT_MAX_RATE,
+                 increase=DEFAULT_INCREASE, decrease=0.5, adaptive=True):
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.max_rate = max(max_rate, rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.adaptive = adaptive
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host):
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.rate)
+        return bucket
+
+    def _take(self, host):
+        """尝试取一个令牌，返回下次检查前应等待的秒数（0表示已取到）"""
+        with self._lock:
+            return min(RECHECK_INTERVAL, self._bucket(host).take())
+
+    def _queue(self, host, delta):
+        with self._lock:
+            self._bucket(host).waiting += delta
+
+    def acquire(self, url):
+        """阻塞直到该host有可用令牌（用于线程）"""
+        host = host_of(url)
+        delay = self._take(host)
+        if not delay:
+            return
+        self._queue(host, 1)
+        try:
+            while delay:
+                time.sleep(delay)
+                delay = self._take(host)
+        finally:
+            self._queue(host, -1)
+
+    async def acquire_async(self, url):
+        """等待直到该host有可用令牌（用于协程，取消时同样退出排队）"""
+        host = host_of(url)
+        delay = self._take(host)
+        if not delay:
+            return
+        self._queue(host, 1)
+        try:
+            while delay:
+                await asyncio.sleep(delay)
+                delay = self._take(host)
+        finally:
+            self._queue(host, -1)
+
+    def on_success(self, url):
+        if not self.adaptive:
+            return
+        with self._lock:
+            bucket = self._bucket(host_of(url))
+            step = 1.0 if bucket.slow_start else self.increase / bucket.rate
+            bucket.rate = min(self.max_rate, bucket.rate + step)
+
+    def on_throttle(self, url):
+        if not self.adaptive:
+            return
+        with self._lock:
+            bucket = self._bucket(host_of(url))
+            bucket.rate = max(self.min_rate, bucket.rate * self.decrease)
+            bucket.slow_start = False
+            # 清空已积累的令牌，让后续请求立即放慢
+            bucket.tokens = min(bucket.tokens, 0.0)
+
+    def feedback(self, url, status=None, code=None):
+        """根据响应状态码/错误码调整该host的速率"""
+        if status in THROTTLE_STATUS or code in THROTTLE_CODES:
+            self.on_throttle(url)
+        else:
+            self.on_success(url)
@@ -0,0 +1,185 @@
+import csv
+import os
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, Border, Side, PatternFill, NamedStyle
+from openpyxl.utils import get_column_letter
+
+# Parquet 输出为可选功能，需要安装pyarrow
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# 支持的报告格式（按扩展名区分）
+REPORT_FORMATS = ("xlsx", "csv", "parquet")
+
+THIN_BORDER = Border(
+    left=Side(style='thin'),
+    right=Side(style='thin'),
+    top=Side(style='thin'),
+    bottom=Side(style='thin')
+)
+
+
+class ExcelReportWriter:
+    """单次写入的流式Excel报告
+
+    使用openpyxl的write_only模式逐行写入，样式通过预先注册的命名样式引用，
+    不需要先写DataFrame再重新打开整个工作簿美化。
+    未指定列宽时先缓存前sample_rows行估算列宽（最大50），再开始写入。
+    """
+
+    def __init__(self, path, columns, column_widths=None, sheet_name='Results',
+                 wrap_text=False, center_columns=(), sample_rows=100):
+        self.path = path
+        self.columns = list(columns)
+        self.rows_written = 0
+        self._column_widths = column_widths
+        self._sample_rows = sample_rows
+        self._pending = []
+
+        self._wb = Workbook(write_only=True)
+        self._ws = self._wb.create_sheet(sheet_name)
+
+        header_style = NamedStyle(
+            name="report_header",
+            font=Font(color="FFFFFF", bold=True),
+            fill=PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid"),
+            border=THIN_BORDER,
+            alignment=Alignment(horizontal="center", vertical="center", wrap_text=True)
+        )
+        data_style = NamedStyle(
+            name="report_data",
+            border=THIN_BORDER,
+            alignment=Alignment(vertical="center", wrap_text=wrap_text)
+        )
+        center_style = NamedStyle(
+            name="report_center",
+            border=THIN_BORDER,
+            alignment=Alignment(horizontal="center", vertical="center")
+        )
+        for style in (header_style, data_style, center_style):
+            self._wb.add_named_style(style)
+
+        self._styles = ["report_center" if col in center_columns else "report_data" for col in self.columns]
+        if column_widths is not None:
+            self._start()
+
+    def _cell(self, value, style):
+        cell = WriteOnlyCell(self._ws, value=value)
+        cell.style = style
+        return cell
+
+    def _start(self):
+        """设置列宽并写入表头（write_only模式下必须在写入数据行之前完成）"""
+        widths = self._column_widths
+        if widths is None:
+            widths = {}
+            for i, col in enumerate(self.columns):
+                length = max([len(str(col))] + [len(str(row.get(col, ""))) for row in self._pending]) + 2
+                widths[get_column_letter(i + 1)] = min(length, 50)  # 最大宽度限制
+
+        for letter, width in widths.items():
+            self._ws.column_dimensions[letter].width = width
+        self._ws.append([self._cell(col, "report_header") for col in self.columns])
+
+        pending, self._pending = self._pending, None
+        for row in pending:
+            self._append(row)
+
+    def _append(self, row):
+        cells = []
+        for col, style in zip(self.columns, self._styles):
+            value = row.get(col)
+            cells.append(self._cell(value, style) if value not in (None, "") else None)
+        self._ws.append(cells)
+
+    def write_row(self, row):
+        self.rows_written += 1
+        if self._pending is not None:
+            self._pending.append(row)
+            if len(self._pending) >= self._sample_rows:
+                self._start()
+            return
+        self._append(row)
+
+    def close(self):
+        if self._pending is not None:
+            self._start()
+        self._wb.save(self.path)
+
+
+class CsvReportWriter:
+    """流式CSV报告（utf-8-sig编码，Excel可直接打开）"""
+
+    def __init__(self, path, columns, **_):
+        self.path = path
+        self.columns = list(columns)
+        self.rows_written = 0
+        self._file = open(path, "w", encoding="utf-8-sig", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=self.columns, extrasaction="ignore")
+        self._writer.writeheader()
+
+    def write_row(self, row):
+        self.rows_written += 1
+        self._writer.writerow(row)
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetReportWriter:
+    """流式Parquet报告，按批写入row group
+
+    所有列固定为字符串类型：按第一批数据推断时，第一批中全为空的列（如S3存储桶的Type/ID）
+    会被推断为null类型，之后有值的批次无法写入。
+    """
+
+    def __init__(self, path, columns, batch_size=10000, **_):
+        if pa is None:
+            raise RuntimeError("输出Parquet需要安装pyarrow: pip install pyarrow")
+        self.path = path
+        self.columns = list(columns)
+        self.rows_written = 0
+        self.batch_size = batch_size
+        self._batch = []
+        self._writer = None
+        self._schema = pa.schema([(col, pa.string()) for col in self.columns])
+
+    def _flush(self):
+        if not self._batch:
+            return
+        rows = [{col: None if row.get(col) is None else str(row[col]) for col in self.columns}
+                for row in self._batch]
+        table = pa.Table.from_pylist(rows, schema=self._schema)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, self._schema)
+        self._writer.write_table(table)
+        self._batch = []
+
+    def write_row(self, row):
+        self.rows_written += 1
+        self._batch.append(row)
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+
+    def close(self):
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+        else:
+            # 没有任何数据时也生成只有表头的文件
+            pq.write_table(pa.Table.from_pylist([], schema=self._schema), self.path)
+
+
+def open_report(path, columns, **options):
+    """根据扩展名创建对应格式的流式报告写入器"""
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    if extension == "csv":
+        return CsvReportWriter(path, columns, **options)
+    if extension == "parquet":
+        return ParquetReportWriter(path, columns, **options)
+    return ExcelReportWriter(path, columns, **options)
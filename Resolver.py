@@ -0,0 +1,136 @@
+import concurrent.futures
+import ipaddress
+import socket
+import threading
+import time
+
+# 解析成功/域名不存在（NXDOMAIN）的结果缓存多久（秒）。系统解析接口不返回TTL，按固定时间缓存
+DEFAULT_TTL = 300
+DEFAULT_NEGATIVE_TTL = 120
+# 预解析时同时进行的DNS查询数
+DEFAULT_WORKERS = 64
+
+# 表示域名不存在的getaddrinfo错误码，其他错误（超时、服务器失败）视为临时错误，不缓存
+NOT_FOUND_ERRORS = {socket.EAI_NONAME} | ({socket.EAI_NODATA} if hasattr(socket, "EAI_NODATA") else set())
+
+# 安装共享解析器之前的系统解析函数（缓存未命中时使用）
+_system_getaddrinfo = socket.getaddrinfo
+
+
+def is_ip(host):
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+class HostResolver:
+    """按主机名缓存DNS结果（包括域名不存在），所有检测引擎共用
+
+    缓存的是地址列表（地址族, IP），与端口无关；域名不存在的结果同样缓存，
+    之后对该主机名的查询直接抛出socket.gaierror，不再访问DNS。线程安全。
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.lookups = 0
+
+    def cached(self, host):
+        """返回缓存的地址列表，域名不存在时为空元组，未缓存或已过期时为None"""
+        key = host.lower().rstrip(".")
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            addresses, expires = entry
+            if time.monotonic() >= expires:
+                del self._entries[key]
+                return None
+            self.hits += 1
+            return addresses
+
+    def is_missing(self, host):
+        """主机名已确认不存在（NXDOMAIN，仍在缓存有效期内）"""
+        return self.cached(host) == ()
+
+    def _store(self, host, addresses):
+        ttl = self.ttl if addresses else self.negative_ttl
+        with self._lock:
+            self._entries[host.lower().rstrip(".")] = (addresses, time.monotonic() + ttl)
+
+    def resolve(self, host):
+        """解析主机名，返回 (地址族, IP) 元组列表；域名不存在时抛出socket.gaierror"""
+        addresses = self.cached(host)
+        if addresses is None:
+            with self._lock:
+                self.lookups += 1
+            try:
+                infos = _system_getaddrinfo(host, None, 0, socket.SOCK_STREAM)
+            except socket.gaierror as e:
+                if e.errno in NOT_FOUND_ERRORS:
+                    self._store(host, ())
+                raise
+            addresses = tuple(dict.fromkeys((family, sockaddr[0]) for family, _, _, _, sockaddr in infos))
+            self._store(host, addresses)
+        if not addresses:
+            raise socket.gaierror(socket.EAI_NONAME, f"{host}: Name or service not known")
+        return addresses
+
+    def prefetch(self, hosts, workers=DEFAULT_WORKERS):
+        """并发预解析一批主机名（已去重），返回 (解析成功数, 不存在数, 临时失败数)"""
+        hosts = [host for host in hosts if host and not is_ip(host)]
+        resolved = missing = failed = 0
+        if not hosts:
+            return resolved, missing, failed
+
+        def lookup(host):
+            try:
+                self.resolve(host)
+                return True
+            except socket.gaierror:
+                return False if self.is_missing(host) else None
+            except (OSError, UnicodeError):
+                return None
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(workers, len(hosts)))) as executor:
+            for found in executor.map(lookup, hosts):
+                if found:
+                    resolved += 1
+                elif found is False:
+                    missing += 1
+                else:
+                    failed += 1
+        return resolved, missing, failed
+
+
+def install(resolver):
+    """让本进程中通过socket.getaddrinfo解析的请求（requests/urllib3等）也使用共享缓存
+
+    IP地址和服务名端口直接交给系统解析。
+    """
+    def getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+        if (not isinstance(host, str) or is_ip(host)
+                or (isinstance(port, str) and not port.isdigit())):
+            return _system_getaddrinfo(host, port, family, type, proto, flags)
+        port = int(port or 0)
+        results = []
+        for address_family, ip in resolver.resolve(host):
+            if family and address_family != family:
+                continue
+            sockaddr = (ip, port) if address_family == socket.AF_INET else (ip, port, 0, 0)
+            results.append((address_family, type or socket.SOCK_STREAM, proto or socket.IPPROTO_TCP, "", sockaddr))
+        if not results:
+            # 缓存中没有所需地址族的地址，交给系统解析
+            return _system_getaddrinfo(host, port, family, type, proto, flags)
+        return results
+
+    socket.getaddrinfo = getaddrinfo
+
+
+def uninstall():
+    socket.getaddrinfo = _system_getaddrinfo
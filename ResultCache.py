@@ -0,0 +1,113 @@
+import json
+import sqlite3
+import threading
+import time
+
+# 默认缓存有效期（秒）和最大条目数
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MAX_ENTRIES = 1000000
+# 累计多少次写入后提交一次事务并检查容量
+COMMIT_EVERY = 500
+
+
+class CacheEntry:
+    """缓存中的一条检测结果"""
+    __slots__ = ("result", "etag", "last_modified", "fresh")
+
+    def __init__(self, result, etag, last_modified, fresh):
+        self.result = result
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fresh = fresh
+
+
+class ResultCache:
+    """基于SQLite的本地结果缓存，按URL保存分类结果及ETag/Last-Modified
+
+    有效期内直接返回缓存结果；过期后由调用方带上 If-None-Match / If-Modified-Since
+    重新验证，返回304时只刷新时间戳。超过容量时按最近访问时间淘汰。
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.revalidated = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " url TEXT PRIMARY KEY,"
+            " result TEXT NOT NULL,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " checked_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON results (accessed_at)")
+        self._conn.commit()
+
+    def get(self, url):
+        """查询缓存，未命中返回None，命中时fresh表示是否仍在有效期内"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, etag, last_modified, checked_at FROM results WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE results SET accessed_at = ? WHERE url = ?", (now, url))
+            self._written()
+
+        fresh = now - row[3] < self.ttl
+        if fresh:
+            self.hits += 1
+        return CacheEntry(json.loads(row[0]), row[1], row[2], fresh)
+
+    def put(self, result, etag=None, last_modified=None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (url, result, etag, last_modified, checked_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (result["url"], json.dumps(result, ensure_ascii=False), etag, last_modified, now, now)
+            )
+            self._written()
+
+    def touch(self, url):
+        """重新验证通过（304），刷新检测时间"""
+        now = time.time()
+        self.revalidated += 1
+        with self._lock:
+            self._conn.execute("UPDATE results SET checked_at = ?, accessed_at = ? WHERE url = ?",
+                               (now, now, url))
+            self._written()
+
+    def _written(self):
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self._commit()
+
+    def _commit(self):
+        self._evict()
+        self._conn.commit()
+        self._pending = 0
+
+    def _evict(self):
+        """超过容量时删除最久未访问的条目"""
+        count = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM results WHERE url IN "
+                "(SELECT url FROM results ORDER BY accessed_at LIMIT ?)", (overflow,)
+            )
+
+    def close(self):
+        with self._lock:
+            self._commit()
+            self._conn.close()
@@ -0,0 +1,98 @@
+import enum
+import sys
+from urllib.parse import urlsplit
+
+import HttpProbe
+
+
+class Verdict(str, enum.Enum):
+    """结果分类（与HttpProbe.verdict_of返回的字符串相等）"""
+    VALID = "valid"
+    INVALID = "invalid"
+    DENIED = "denied"
+    ERROR = "error"
+
+
+# 每个host的分类计数按此顺序存放在列表中
+VERDICT_INDEX = {verdict: index for index, verdict in enumerate(Verdict)}
+
+
+def intern_text(value):
+    """Code、host等取值很少的字符串只保留一份（Message常含每个URL不同的错误信息，不驻留）"""
+    return sys.intern(value) if value else ""
+
+
+def verdict_of(result):
+    """结果字典的分类，驱动借出超时等没有结果的情况计为错误"""
+    return Verdict(HttpProbe.verdict_of(result)) if result else Verdict.ERROR
+
+
+class ResultRecord:
+    """紧凑的检测结果：分类用枚举保存，Code驻留，需要写日志或报告时再转换为结果字典"""
+
+    __slots__ = ("url", "code", "message", "resource", "request_id", "verdict", "inferred")
+
+    def __init__(self, url, code="", message="", resource="", request_id="", verdict=Verdict.VALID,
+                 inferred=False):
+        self.url = url
+        self.code = intern_text(code)
+        self.message = message
+        self.resource = resource
+        self.request_id = request_id
+        self.verdict = verdict
+        self.inferred = inferred
+
+    @classmethod
+    def from_dict(cls, result):
+        return cls(result["url"], result["Code"], result["Message"], result["Resource"], result["RequestId"],
+                   verdict_of(result), bool(result.get("inferred")))
+
+    def to_dict(self):
+        result = {
+            "url": self.url,
+            "Code": self.code,
+            "Message": self.message,
+            "Resource": self.resource,
+            "RequestId": self.request_id,
+            "valid": self.verdict is Verdict.VALID,
+            "access_denied": self.verdict is Verdict.DENIED
+        }
+        if self.inferred:
+            result["inferred"] = True
+        return result
+
+
+class Aggregator:
+    """随结果到达增量更新的统计：各分类数量、推断数量和每个host的分类计数"""
+
+    def __init__(self):
+        self.counts = dict.fromkeys(Verdict, 0)
+        self.inferred = 0
+        self.hosts = {}
+
+    def add(self, result):
+        verdict = verdict_of(result)
+        self.counts[verdict] += 1
+        if not result:
+            return
+        self.inferred += bool(result.get("inferred"))
+        try:
+            host = intern_text(urlsplit(result["url"]).netloc.lower())
+        except ValueError:
+            # 无法解析的URL不计入按host的统计
+            return
+        row = self.hosts.get(host)
+        if row is None:
+            row = self.hosts[host] = [0] * len(VERDICT_INDEX)
+        row[VERDICT_INDEX[verdict]] += 1
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def top_hosts(self, verdict=Verdict.VALID, limit=10):
+        """按某一分类数量从多到少排列的host，返回 (host, 分类 -> 数量) 列表"""
+        index = VERDICT_INDEX[verdict]
+        ranked = sorted((item for item in self.hosts.items() if item[1][index]),
+                        key=lambda item: -item[1][index])[:limit]
+        return [(host, dict(zip(Verdict, row))) for host, row in ranked]
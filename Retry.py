@@ -0,0 +1,145 @@
+import asyncio
+import random
+import threading
+import time
+
+# 默认重试次数（不含第一次请求）、退避基数和上限（秒）
+DEFAULT_RETRIES = 2
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 10.0
+# 连续失败多少次后熔断该host，熔断多久后放行一个探测请求（秒）
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+
+# 熔断时返回结果中的错误信息
+CIRCUIT_OPEN_MESSAGE = "Circuit open"
+
+
+class CircuitOpenError(Exception):
+    """host处于熔断状态，请求未发出"""
+
+
+class RetryPolicy:
+    """指数退避重试策略，等待时间在 [0, min(max_delay, base_delay * 2^n)] 内随机（full jitter）"""
+
+    def __init__(self, retries=DEFAULT_RETRIES, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY):
+        self.retries = max(0, retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt):
+        """第attempt次重试前的等待秒数（attempt从0开始）"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """按host的熔断器
+
+    连续失败达到阈值后熔断，熔断期间直接拒绝请求；超过reset_timeout后只放行一个探测请求，
+    成功则恢复，失败则继续熔断。线程安全，Selenium线程池和异步引擎都可以共用。
+    """
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = {}
+        self._opened_at = {}
+        self._probing = set()
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        with self._lock:
+            opened_at = self._opened_at.get(key)
+            if opened_at is None:
+                return True
+            if key in self._probing or time.monotonic() - opened_at < self.reset_timeout:
+                return False
+            # 半开：放行一个探测请求
+            self._probing.add(key)
+            return True
+
+    def record_success(self, key):
+        with self._lock:
+            self._failures.pop(key, None)
+            self._opened_at.pop(key, None)
+            self._probing.discard(key)
+
+    def record_failure(self, key):
+        with self._lock:
+            failures = self._failures.get(key, 0) + 1
+            self._failures[key] = failures
+            if key in self._probing or failures >= self.failure_threshold:
+                self._opened_at[key] = time.monotonic()
+                self._probing.discard(key)
+
+    def release(self, key):
+        """探测请求因其他原因中断时，允许下一次重新探测"""
+        with self._lock:
+            self._probing.discard(key)
+
+    def open_count(self):
+        with self._lock:
+            return len(self._opened_at)
+
+
+def _record(breaker, key, host_failure):
+    if breaker:
+        if host_failure:
+            breaker.record_failure(key)
+        else:
+            breaker.record_success(key)
+
+
+def call(fn, policy=None, breaker=None, key=None, retry_on=(), should_retry=None, is_host_failure=None):
+    """调用fn，失败时按策略重试
+
+    retry_on为需要重试的异常类型，should_retry(返回值)为True时也重试，重试用完后返回最后一次的值或抛出最后的异常。
+    is_host_failure(返回值)决定是否计入熔断（默认与should_retry相同；异常总是计入）。
+    熔断时抛出CircuitOpenError。
+    """
+    attempts = (policy.retries if policy else 0) + 1
+    is_host_failure = is_host_failure or should_retry
+    for attempt in range(attempts):
+        if breaker and not breaker.allow(key):
+            raise CircuitOpenError(key)
+        try:
+            value = fn()
+        except retry_on:
+            _record(breaker, key, True)
+            if attempt == attempts - 1:
+                raise
+        except Exception:
+            if breaker:
+                breaker.release(key)
+            raise
+        else:
+            retry = bool(should_retry and should_retry(value))
+            _record(breaker, key, bool(retry and is_host_failure(value)))
+            if not retry or attempt == attempts - 1:
+                return value
+        time.sleep(policy.backoff(attempt))
+
+
+async def call_async(fn, policy=None, breaker=None, key=None, retry_on=(), should_retry=None, is_host_failure=None):
+    """call的协程版本，fn为返回协程的函数"""
+    attempts = (policy.retries if policy else 0) + 1
+    is_host_failure = is_host_failure or should_retry
+    for attempt in range(attempts):
+        if breaker and not breaker.allow(key):
+            raise CircuitOpenError(key)
+        try:
+            value = await fn()
+        except retry_on:
+            _record(breaker, key, True)
+            if attempt == attempts - 1:
+                raise
+        except Exception:
+            if breaker:
+                breaker.release(key)
+            raise
+        else:
+            retry = bool(should_retry and should_retry(value))
+            _record(breaker, key, bool(retry and is_host_failure(value)))
+            if not retry or attempt == attempts - 1:
+                return value
+        await asyncio.sleep(policy.backoff(attempt))
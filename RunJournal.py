@@ -0,0 +1,93 @@
+import json
+import os
+import threading
+import time
+
+# 默认日志文件名
+DEFAULT_JOURNAL = "checker_journal.jsonl"
+# 不续跑时已有的非空日志改名保留：原文件名 + 修改时间 + 此后缀（不以.jsonl结尾，不会被合并时的通配符选中）
+ROTATED_SUFFIX = ".bak"
+
+
+class RunJournal:
+    """追加写入的检测日志（JSONL），每条分类结果一行
+
+    写入后最多缓冲1秒再落盘，进程被中断时已完成的结果不会丢失（close时全部写入）。
+    不续跑时不覆盖已有的非空日志，而是先改名保留（改名后的路径见rotated）。
+    """
+
+    def __init__(self, path=DEFAULT_JOURNAL, resume=False, flush_interval=1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self.rotated = None if resume else rotate(path)
+
+        # 续跑时追加；上次崩溃可能留下写了一半的行，先补一个换行
+        needs_newline = resume and _ends_without_newline(path)
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+        if needs_newline:
+            self._file.write("\n")
+
+    def append(self, result):
+        line = json.dumps(result, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            now = time.monotonic()
+            if now - self._last_flush >= self.flush_interval:
+                self._file.flush()
+                self._last_flush = now
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def rotate(path):
+    """把已有的非空日志改名为 原文件名.修改时间.bak，返回新路径；没有需要保留的日志时返回None"""
+    try:
+        if os.path.getsize(path) == 0:
+            return None
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(os.path.getmtime(path)))
+    except FileNotFoundError:
+        return None
+    target = f"{path}.{stamp}{ROTATED_SUFFIX}"
+    count = 1
+    while os.path.exists(target):
+        target = f"{path}.{stamp}-{count}{ROTATED_SUFFIX}"
+        count += 1
+    os.replace(path, target)
+    return target
+
+
+def _ends_without_newline(path):
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+    except FileNotFoundError:
+        return False
+
+
+def iter_journal(path):
+    """逐条读取日志中的结果，跳过损坏的行"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
@@ -0,0 +1,174 @@
+import math
+import random
+from statistics import NormalDist
+from urllib.parse import urlsplit
+
+import HttpProbe
+
+# 默认置信度、允许误差（置信区间半宽）、每轮每个分层的抽样数、每个分层最多抽样数
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_MARGIN = 0.05
+DEFAULT_BATCH = 20
+DEFAULT_MAX_SAMPLES = 400
+
+# 无法解析的URL（如 http://[bad）所在的分层，检测时记为错误
+UNPARSABLE_STRATUM = ("(无法解析的URL)", "")
+
+# 抽样报告的列
+SAMPLE_COLUMNS = ["存储桶", "前缀", "对象总数", "已抽样", "公开", "访问拒绝", "不存在", "错误",
+                  "公开比例估计", "置信下限", "置信上限", "估计公开对象数", "结论"]
+
+
+def stratum_of(url):
+    """分层依据：存储桶 + 一级前缀（根目录下的对象前缀为空），无法解析的URL归入单独的分层"""
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return UNPARSABLE_STRATUM
+    path = parts.path.lstrip('/')
+    prefix = path.split('/', 1)[0] + '/' if '/' in path else ''
+    return f"{parts.scheme}://{parts.netloc}/", prefix
+
+
+def wilson_interval(public, n, z, population=None):
+    """Wilson置信区间，population给定时使用有限总体校正（按校正系数缩小z，全部抽样时区间收缩为p）"""
+    if n == 0:
+        return 0.0, 1.0
+    p = public / n
+    if population and population > 1:
+        z *= math.sqrt(max(0.0, (population - n) / (population - 1)))
+    z2 = z * z
+    center = (p + z2 / (2 * n)) / (1 + z2 / n)
+    half = z * math.sqrt(p * (1 - p) / n + z2 / (4 * n * n)) / (1 + z2 / n)
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+class Stratum:
+    """一个分层：对URL做蓄水池抽样，并累计已检测样本的结果"""
+
+    def __init__(self, bucket, prefix, max_samples, rng):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.max_samples = max_samples
+        self.rng = rng
+        self.total = 0
+        self.reservoir = []
+        self.cursor = 0
+        self.public = 0
+        self.denied = 0
+        self.missing = 0
+        self.errors = 0
+
+    @property
+    def checked(self):
+        """得出明确结论的样本数（不含错误）"""
+        return self.public + self.denied + self.missing
+
+    def offer(self, url):
+        self.total += 1
+        if len(self.reservoir) < self.max_samples:
+            self.reservoir.append(url)
+        else:
+            j = self.rng.randrange(self.total)
+            if j < self.max_samples:
+                self.reservoir[j] = url
+
+    def next_batch(self, size):
+        batch = self.reservoir[self.cursor:self.cursor + size]
+        self.cursor += len(batch)
+        return batch
+
+    def record(self, result):
+        if result["access_denied"]:
+            self.denied += 1
+        elif result["valid"]:
+            self.public += 1
+        elif HttpProbe.is_error(result):
+            self.errors += 1
+        else:
+            self.missing += 1
+
+    def interval(self, z):
+        return wilson_interval(self.public, self.checked, z, self.total)
+
+    def exhausted(self):
+        return self.cursor >= len(self.reservoir)
+
+    def settled(self, z, margin):
+        """置信区间半宽不超过允许误差，或样本已经用完"""
+        if self.exhausted():
+            return True
+        low, high = self.interval(z)
+        return self.checked > 0 and (high - low) / 2 <= margin
+
+    def verdict(self):
+        if self.checked == 0:
+            return "无法判断"
+        if self.public == 0:
+            return "未发现公开"
+        if self.public == self.checked:
+            return "全部公开"
+        return "部分公开"
+
+    def to_row(self, z):
+        low, high = self.interval(z)
+        estimate = self.public / self.checked if self.checked else 0.0
+        return {
+            "存储桶": self.bucket,
+            "前缀": self.prefix or "/",
+            "对象总数": self.total,
+            "已抽样": self.checked + self.errors,
+            "公开": self.public,
+            "访问拒绝": self.denied,
+            "不存在": self.missing,
+            "错误": self.errors,
+            "公开比例估计": round(estimate, 4),
+            "置信下限": round(low, 4),
+            "置信上限": round(high, 4),
+            "估计公开对象数": round(estimate * self.total),
+            "结论": self.verdict()
+        }
+
+
+def collect_strata(urls, max_samples=DEFAULT_MAX_SAMPLES, seed=None):
+    """一次遍历URL，按分层做蓄水池抽样，内存只与分层数×抽样上限相关"""
+    rng = random.Random(seed)
+    strata = {}
+    for url in urls:
+        key = stratum_of(url)
+        stratum = strata.get(key)
+        if stratum is None:
+            stratum = strata[key] = Stratum(key[0], key[1], max_samples, rng)
+        stratum.offer(url)
+
+    # 蓄水池中的样本打乱顺序，按轮次依次取出
+    for stratum in strata.values():
+        rng.shuffle(stratum.reservoir)
+    return list(strata.values())
+
+
+def run_sampling(strata, confidence=DEFAULT_CONFIDENCE, margin=DEFAULT_MARGIN, batch=DEFAULT_BATCH,
+                 on_round=None, concurrency=HttpProbe.DEFAULT_CONCURRENCY, **probe_options):
+    """按轮次抽样检测，每轮只对尚未确定结论的分层继续抽样"""
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    round_no = 0
+
+    while True:
+        active = [s for s in strata if not s.settled(z, margin)]
+        owners = {}
+        for stratum in active:
+            for url in stratum.next_batch(batch):
+                owners[url] = stratum
+        if not owners:
+            break
+
+        round_no += 1
+        if on_round:
+            on_round(round_no, len(active), len(owners))
+
+        def handle(result):
+            owners[result["url"]].record(result)
+
+        HttpProbe.run_probe(list(owners), handle, concurrency=min(concurrency, len(owners)), **probe_options)
+
+    return z
@@ -0,0 +1,139 @@
+import sqlite3
+import threading
+import time
+
+# 对象的变更类型
+ADDED = "added"
+CHANGED = "changed"
+REMOVED = "removed"
+CHANGE_LABELS = {ADDED: "新增", CHANGED: "变化", REMOVED: "删除"}
+
+# 累计多少次写入后提交一次事务
+COMMIT_EVERY = 1000
+# 读取已删除对象时每次取出的行数
+REMOVED_PAGE_SIZE = 1000
+
+
+class SnapshotStore:
+    """基于SQLite的列举快照，按 (列举范围, Key) 保存 ETag / Size / LastModified
+
+    列举范围通常就是存储桶URL。一次列举的结果先写入pending表，与上次的快照（objects表）
+    逐条比较；只有列举完整结束后调用finish()才替换快照，列举中途失败或被中断时
+    上次的快照保持不变，下次仍能得到完整的差异。多个存储桶可以在不同线程中同时列举。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for table in ("objects", "pending"):
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                " scope TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " etag TEXT,"
+                " size TEXT,"
+                " last_modified TEXT,"
+                " PRIMARY KEY (scope, key)) WITHOUT ROWID"
+            )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scopes ("
+            " scope TEXT PRIMARY KEY,"
+            " objects INTEGER NOT NULL,"
+            " listed_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def begin(self, scope):
+        """开始一次列举，清除该范围上次未完成的列举结果"""
+        with self._lock:
+            self._conn.execute("DELETE FROM pending WHERE scope = ?", (scope,))
+            self._conn.commit()
+
+    def observe(self, scope, record):
+        """记录一个列举到的对象，返回相对上次快照的变更类型（ADDED / CHANGED，未变化时为None）"""
+        values = (record.get('ETag') or None, record.get('Size') or None, record.get('LastModified') or None)
+        with self._lock:
+            row = self._conn.execute("SELECT etag, size, last_modified FROM objects WHERE scope = ? AND key = ?",
+                                     (scope, record['Key'])).fetchone()
+            self._conn.execute("INSERT OR REPLACE INTO pending (scope, key, etag, size, last_modified)"
+                               " VALUES (?, ?, ?, ?, ?)", (scope, record['Key']) + values)
+            self._written()
+        if row is None:
+            return ADDED
+        return CHANGED if is_changed(row, values) else None
+
+    def removed(self, scope):
+        """逐条产出上次快照中有、本次列举中没有的对象（在列举完成后、finish()之前调用）"""
+        last_key = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT key, etag, size, last_modified FROM objects o"
+                    " WHERE scope = ? AND key > ? AND NOT EXISTS"
+                    " (SELECT 1 FROM pending p WHERE p.scope = o.scope AND p.key = o.key)"
+                    " ORDER BY key LIMIT ?", (scope, last_key, REMOVED_PAGE_SIZE)
+                ).fetchall()
+            for key, etag, size, last_modified in rows:
+                yield {'Key': key, 'ETag': etag or '', 'Size': size or '', 'LastModified': last_modified or ''}
+            if len(rows) < REMOVED_PAGE_SIZE:
+                return
+            last_key = rows[-1][0]
+
+    def finish(self, scope):
+        """列举完整结束：用本次列举结果替换该范围的快照"""
+        with self._lock:
+            try:
+                self._conn.execute("DELETE FROM objects WHERE scope = ?", (scope,))
+                self._conn.execute("INSERT INTO objects SELECT * FROM pending WHERE scope = ?", (scope,))
+                count = self._conn.execute("SELECT COUNT(*) FROM objects WHERE scope = ?", (scope,)).fetchone()[0]
+                self._conn.execute("DELETE FROM pending WHERE scope = ?", (scope,))
+                self._conn.execute("INSERT OR REPLACE INTO scopes (scope, objects, listed_at) VALUES (?, ?, ?)",
+                                   (scope, count, time.time()))
+                self._conn.commit()
+            except sqlite3.Error:
+                self._conn.rollback()
+                raise
+            self._pending = 0
+
+    def discard(self, scope):
+        """列举失败：丢弃本次的结果，快照保持不变"""
+        with self._lock:
+            self._conn.execute("DELETE FROM pending WHERE scope = ?", (scope,))
+            self._conn.commit()
+            self._pending = 0
+
+    def _written(self):
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+
+def is_changed(previous, current):
+    """(etag, size, last_modified) 是否有变化：双方都有ETag时只比较ETag，否则比较大小和修改时间"""
+    if previous[0] and current[0]:
+        return previous[0] != current[0]
+    return previous[1:] != current[1:]
+
+
+def diff_listing(store, scope, records):
+    """将列举结果与上次快照比较，逐条产出 (变更类型, 记录)
+
+    先随列举产出新增和变化的对象，列举完成后再产出已删除的对象。全部产出后
+    由调用方调用 store.finish(scope) 保存快照（例如在这些对象检测完成之后）。
+    """
+    store.begin(scope)
+    for record in records:
+        change = store.observe(scope, record)
+        if change:
+            yield change, record
+    yield from ((REMOVED, record) for record in store.removed(scope))
@@ -0,0 +1,35 @@
+import gzip
+import io
+import sys
+
+# 表示从标准输入读取URL的文件名
+STDIN = "-"
+
+
+def is_stdin(path):
+    return path == STDIN
+
+
+def open_urls(path):
+    """打开URL列表：'-' 为标准输入，.gz 结尾按gzip解压，其余按utf-8文本读取"""
+    if is_stdin(path):
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", errors="replace")
+    if path.lower().endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def iter_urls(path):
+    """逐行惰性读取URL，跳过空行，不会把整个列表读入内存"""
+    with open_urls(path) as f:
+        for line in f:
+            url = line.strip()
+            if url:
+                yield url
+
+
+def count_urls(path, keep=None):
+    """预先统计URL数用于显示进度（流式计数，不保存URL），标准输入无法预先统计时返回None"""
+    if is_stdin(path):
+        return None
+    return sum(1 for url in iter_urls(path) if keep is None or keep(url))